@@ -1,7 +1,10 @@
-# Calculate % composition of landcover classes in delineated watershed
+# Calculate % composition of landcover classes in delineated watershed and experimental basins (see zonal.py)
 
 import config as config
 import numpy as np
+from grid_io import read_layer
+from reclassify import load_classes, reclassify
+from zonal import zonal_composition
 import pandas as pd
 from scipy import ndimage
 import matplotlib.pyplot as plt
@@ -13,81 +16,57 @@ importlib.reload(config)
 # Imports
 
 # Ellsworth watershed outlet is at x=284, y=236. Delineated DEM exported from JPDEM after flat-processing
-del_dem = np.loadtxt(config.dem_velma.parents[0] / 'delineated_dem.asc', skiprows=6)
-watershed = (del_dem != -9999)
+# Layers are loaded as compact arrays with NODATA cells masked
+del_dem, del_dem_header = read_layer(config.dem_velma.parents[0] / 'delineated_dem.asc', 'dem')
+watershed = ~np.ma.getmaskarray(del_dem)
 plt.imshow(watershed)
 
 # ================================
 # Stands
 stands_path = str(config.cover_type_velma)
 cover_key = pd.read_csv(str(config.cover_type_velma.parents[0] / 'cover_type_key.csv'))
-stands = np.loadtxt(stands_path, skiprows=6)
+stands = read_layer(stands_path, 'cover_type')[0]
 
 # ================================
-# NOAA C-CAP
-ccap_path = str(config.noaa_ccap_velma)
-ccap = np.loadtxt(ccap_path, skiprows=6)
-ccap = ccap + 100
+# NOAA C-CAP and NLCD, reclassified to their merged cover ids (value + 100) with the class tables shared with
+# cover_combine_ccap.py and cover_permeability.py
+ccap_classes = load_classes('ccap')
+nlcd_classes = load_classes('nlcd')
 
-# CCAP class values
-ccap_NA = 100
-ccap_herby = 101
-ccap_dirt = 102
-ccap_developed = 103
-ccap_water = 104
-ccap_forest = 105
-ccap_shrub = 106
+ccap_path = str(config.noaa_ccap_velma)
+ccap = read_layer(ccap_path, 'noaa_ccap')[0]
+ccap = np.ma.array(reclassify(ccap.data, ccap_classes.lut(), classes=ccap_classes), mask=np.ma.getmaskarray(ccap))
 
-# ================================
-# NLCD
 nlcd_path = str(config.nlcd_velma)
-stands_path = str(config.cover_type_velma)
-cover_key = pd.read_csv(str(config.cover_type_velma.parents[0] / 'cover_type_key.csv'))
-nlcd = np.loadtxt(nlcd_path, skiprows=6)
+nlcd = read_layer(nlcd_path, 'nlcd')[0]
+nlcd_raw = nlcd.data
 
-nlcd = nlcd + 100
-
-# NLCD class values
-nlcd_open_water = 111
-nlcd_dev_openspace = 121
-nlcd_dev_low = 122
-nlcd_dev_med = 123
-nlcd_dev_high = 124
-nlcd_barren = 131
-nlcd_forest_decid = 141
-nlcd_forest_evergreen = 142
-nlcd_forest_mixed = 143
-nlcd_shrub = 152
-nlcd_herby = 171
-nlcd_woody_wet = 190
-nlcd_emerg_herb_wet = 195
+# Class values
+ccap_dirt = ccap_classes.id('dirt')
+nlcd_forest_decid = nlcd_classes.id('forest_decid')
 
 # =======================================================================
 # Combine covers
 
 # Erode NLCD roads by 1 pixel - they look to be about 10-20m, not 30m
-road_mask = (nlcd == nlcd_dev_openspace) + (nlcd == nlcd_dev_low)
+road_mask = nlcd_classes.is_class(nlcd_raw, ['dev_openspace', 'dev_low'])
 roads = ndimage.binary_erosion(road_mask, iterations=1)
 
 # Place erodedNLCD roads on top of CCAP
 ccap[roads] = ccap_dirt
 
-# Add NLCD deciduous forest to CCAP
-ccap[nlcd_forest_decid] = nlcd_forest_decid
+# Add NLCD deciduous forest to CCAP. This used to be ccap[nlcd_forest_decid], which set row 141 instead of the
+# deciduous cells
+ccap[nlcd_classes.is_class(nlcd_raw, ['forest_decid'])] = nlcd_forest_decid
 
 # =======================================================================
 # Calculate composition
 
-# Mask out values outside delineated watershed
-cover_mask = ccap.copy()
-cover_mask[~watershed] = np.nan
-
-# Count class occurrences within
-cover_mask_flat = cover_mask[~np.isnan(cover_mask)].flatten()
-cover_count = np.bincount(cover_mask_flat.astype('int'))
-cover_count = cover_count[cover_count != 0]
-stack = np.column_stack([np.unique(cover_mask_flat), cover_count])
-counts = pd.DataFrame(data=stack, columns=['Class', 'Count'])
-counts['Count'] = counts['Count'] / cover_mask_flat.shape[0]
-
-
+# Counts, areas and fractions of each class in the watershed and in each experimental basin (by treatment)
+exp_basins = read_layer(config.exp_basins_velma, 'exp_basins')[0]
+class_names = {**{i: name for name, i in ccap_classes.ids.items()}, nlcd_forest_decid: 'forest_decid'}
+cellsize = del_dem_header.cellsize
+composition = pd.concat([zonal_composition({'watershed': watershed}, ccap, cellsize, class_names),
+                         zonal_composition(np.ma.masked_where(~watershed, exp_basins), ccap, cellsize, class_names)],
+                        ignore_index=True)
+print(composition.to_string(index=False))
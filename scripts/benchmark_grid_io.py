@@ -0,0 +1,65 @@
+# Benchmarks grid_io.read_grid against np.loadtxt(path, skiprows=6) on synthetic grids the size of the Ellsworth
+# 10m, 5m and 3m VELMA inputs. With numpy < 1.23 np.loadtxt is pure Python and read_grid uses the pandas C reader;
+# with newer numpy both use the numpy C parser, so the pandas reader is also timed on its own for comparison
+# Script written in Python 3.7
+
+import numpy as np
+import tempfile
+import time
+from pathlib import Path
+import grid_io
+from grid_io import GridHeader, read_grid
+
+# ======================================================================================================================
+# Config
+base_shape = (767, 402)  # Ellsworth 10m grid
+resolutions = [10, 5, 3]
+repeats = 3
+
+tmp_dir = Path(tempfile.mkdtemp())
+
+
+def best_time(func, path):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        func(path)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def read_grid_pandas(path):
+    c_loadtxt = grid_io.NUMPY_C_LOADTXT
+    grid_io.NUMPY_C_LOADTXT = False
+    try:
+        return read_grid(path)
+    finally:
+        grid_io.NUMPY_C_LOADTXT = c_loadtxt
+
+
+# =======================================================================
+# Write synthetic integer grids (e.g. stand IDs) at each resolution, then time the readers
+
+rng = np.random.default_rng(0)
+print('numpy {}'.format(np.__version__))
+print('{:>6} {:>12} {:>12} {:>14} {:>12} {:>8}'.format('res', 'shape', 'loadtxt (s)', 'read_grid (s)', 'pandas (s)',
+                                                        'speedup'))
+for res in resolutions:
+    scale = 10 / res
+    nrows, ncols = int(base_shape[0] * scale), int(base_shape[1] * scale)
+    arr = rng.integers(0, 500, size=(nrows, ncols))
+    header = GridHeader(ncols=ncols, nrows=nrows, xll=0, yll=0, cellsize=res)
+    path = tmp_dir / 'grid_{}m.asc'.format(res)
+    with open(path, 'w') as f:
+        f.write(header.to_text())
+        np.savetxt(f, arr, fmt='%i')
+
+    assert np.array_equal(read_grid(path)[0], np.loadtxt(path, skiprows=6))
+    assert np.array_equal(read_grid_pandas(path)[0], np.loadtxt(path, skiprows=6))
+
+    t_loadtxt = best_time(lambda p: np.loadtxt(p, skiprows=6), path)
+    t_read_grid = best_time(read_grid, path)
+    t_pandas = best_time(read_grid_pandas, path)
+    print('{:>5}m {:>12} {:>12.3f} {:>14.3f} {:>12.3f} {:>7.1f}x'.format(res, '{}x{}'.format(nrows, ncols), t_loadtxt,
+                                                                        t_read_grid, t_pandas,
+                                                                        t_loadtxt / t_read_grid))
@@ -0,0 +1,54 @@
+# Benchmarks nearest_fill.nearest_fill against calling soil_merger.lookAround on every NoData cell, on synthetic soil
+# texture grids with scattered NoData cells and large rectangular holes
+# Script written in Python 3.7
+
+import numpy as np
+import time
+from soil_merger import lookAround
+from nearest_fill import nearest_fill
+
+# ======================================================================================================================
+# Config
+shapes = [(100, 100), (767, 402), (1534, 804)]  # Small test grid, then Ellsworth 10m and 5m
+hole_fraction = 0.25  # Width/height of the large hole, as a fraction of the grid
+scattered_fraction = 0.05  # Fraction of cells that are scattered NoData
+lookaround_max_cells = 100 * 100  # lookAround is skipped on larger grids, as it takes hours
+
+
+def look_around_fill(arr):
+    out = arr.copy()
+    for i, j in zip(*np.nonzero(arr == -9999)):
+        out[i, j] = lookAround(i, j, arr)
+    return out
+
+
+# =======================================================================
+# Time both on each grid and check that the chessboard fill matches lookAround
+
+rng = np.random.default_rng(0)
+print('{:>10} {:>10} {:>16} {:>16} {:>16} {:>16}'.format('shape', 'nodata', 'lookAround (s)', 'chessboard (s)',
+                                                          'taxicab (s)', 'euclidean (s)'))
+for nrows, ncols in shapes:
+    soil = rng.integers(1, 12, size=(nrows, ncols)).astype(float)
+    soil[rng.random((nrows, ncols)) < scattered_fraction] = -9999
+    hole_rows, hole_cols = int(nrows * hole_fraction), int(ncols * hole_fraction)
+    soil[nrows // 3:nrows // 3 + hole_rows, ncols // 3:ncols // 3 + hole_cols] = -9999
+
+    times = {}
+    for metric in ['chessboard', 'taxicab', 'euclidean']:
+        t0 = time.perf_counter()
+        filled = nearest_fill(soil, -9999, metric=metric)
+        times[metric] = time.perf_counter() - t0
+        assert not (filled == -9999).any()
+
+    if nrows * ncols <= lookaround_max_cells:
+        t0 = time.perf_counter()
+        reference = look_around_fill(soil)
+        t_lookaround = '{:.3f}'.format(time.perf_counter() - t0)
+        assert np.array_equal(reference, nearest_fill(soil, -9999))
+    else:
+        t_lookaround = 'skipped'
+
+    print('{:>10} {:>10} {:>16} {:>16.3f} {:>16.3f} {:>16.3f}'.format(
+        '{}x{}'.format(nrows, ncols), int((soil == -9999).sum()), t_lookaround, times['chessboard'],
+        times['taxicab'], times['euclidean']))
@@ -0,0 +1,139 @@
+# Columnar store of the climate forcing data (VIC-WRF fluxes, WRF forcings, PRISM and gauge records)
+# Each model/run is ingested once from its text file into <root>/<source>/<model>/<run>.npz, holding a datetime64
+# time index and one array per variable, so scripts read only the variables they use and slice date ranges with a
+# binary search on the time index, without parsing the text files again. Runs are re-ingested only when their text file
+# is newer than the store
+# Script written in Python 3.7
+
+import os
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+# ======================================================================================================================
+# Raw VIC-WRF text files from the University of Washington Climate Impacts Group
+
+VICWRF_FLUX = {'file': 'flux_46.40625_-123.90625',
+               'columns': ["YEAR", "MONTH", "DAY", "HOUR", "OUT_PREC", "OUT_PET_SHORT",
+                           "OUT_SWE", "OUT_EVAP", "OUT_RUNOFF", "OUT_BASEFLOW",
+                           "OUT_SOIL_MOIST0", "OUT_SOIL_MOIST1", "OUT_SOIL_MOIST2"],
+               'time': ["YEAR", "MONTH", "DAY", "HOUR"]}
+
+WRF_FORCING = {'file': 'forc_46.40625_-123.90625',
+               'columns': ['Year', 'Month', 'Day', 'Hour', 'Precip(mm)', 'Temp(C)',
+                           'Wind(m/s)', 'SWrad(W/m2)', 'LWrad(W/m2)', 'pressure(kPa)',
+                           'VaporPress(kPa)'],
+               'time': ['Year', 'Month', 'Day', 'Hour']}
+
+
+def read_text_table(path, columns, time):
+    """
+    Reads a whitespace delimited VIC-WRF text file into a DataFrame indexed by time. time names the year, month, day
+    and hour columns, which are dropped from the variables
+    """
+    df = pd.read_csv(str(path), sep=r'\s+', header=None, names=columns, float_precision='round_trip')
+    year, month, day, hour = time
+    index = pd.to_datetime(pd.DataFrame({'year': df[year], 'month': df[month], 'day': df[day], 'hour': df[hour]}))
+    df = df.drop(columns=time).astype(np.float64)
+    df.index = pd.DatetimeIndex(index, name='time')
+    return df
+
+
+class ClimateStore:
+    """ Directory of ingested climate series, keyed by (source, model, run) """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def path(self, source, model, run):
+        return self.root / source / model / '{}.npz'.format(run)
+
+    def models(self, source):
+        return sorted(p.name for p in (self.root / source).iterdir() if p.is_dir())
+
+    def runs(self, source, model):
+        return sorted(p.stem for p in (self.root / source / model).glob('*.npz'))
+
+    def is_current(self, source, model, run, text_path):
+        """ True if the run is in the store and newer than its text file """
+        path = self.path(source, model, run)
+        return path.exists() and os.stat(str(path)).st_mtime_ns >= os.stat(str(text_path)).st_mtime_ns
+
+    def write(self, source, model, run, frame):
+        """ Stores the numeric columns of a DataFrame with a DatetimeIndex """
+        frame = frame.select_dtypes('number')
+        path = self.path(source, model, run)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Variables are stored by position, as names like 'Wind(m/s)' aren't valid archive member names
+        arrays = {'var{}'.format(i): frame[col].to_numpy() for i, col in enumerate(frame.columns)}
+        tmp_path = str(path) + '.{}.tmp'.format(os.getpid())
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, time=frame.index.values.astype('datetime64[s]'),
+                                columns=np.array(frame.columns, dtype=str), **arrays)
+        os.replace(tmp_path, str(path))
+
+    def read(self, source, model, run, variables=None, start=None, end=None):
+        """ DataFrame of a run, with only the given variables (all by default) and times from start to end inclusive """
+        with np.load(str(self.path(source, model, run))) as data:
+            time = data['time']
+            columns = data['columns'].tolist()
+            lo = 0 if start is None else np.searchsorted(time, np.datetime64(pd.Timestamp(start)), side='left')
+            hi = len(time) if end is None else np.searchsorted(time, np.datetime64(pd.Timestamp(end)), side='right')
+            variables = columns if variables is None else list(variables)
+            values = {var: data['var{}'.format(columns.index(var))][lo:hi] for var in variables}
+        return pd.DataFrame(values, index=pd.DatetimeIndex(time[lo:hi], name='time'))
+
+    def ingest_text(self, source, model, run, text_path, layout, overwrite=False):
+        """ Ingests a VIC-WRF text file (layout VICWRF_FLUX or WRF_FORCING). Returns True if it was (re-)ingested """
+        if not overwrite and self.is_current(source, model, run, text_path):
+            return False
+        self.write(source, model, run, read_text_table(text_path, layout['columns'], layout['time']))
+        return True
+
+    def ingest_csv(self, source, model, run, csv_path, overwrite=False, **read_csv_kwargs):
+        """ Ingests a daily record from a CSV, read with pd.read_csv(csv_path, parse_dates=True, **read_csv_kwargs) """
+        if not overwrite and self.is_current(source, model, run, csv_path):
+            return False
+        frame = pd.read_csv(str(csv_path), parse_dates=True, **read_csv_kwargs)
+        frame.index = pd.DatetimeIndex(frame.index, name='time')
+        self.write(source, model, run, frame)
+        return True
+
+
+def vicwrf_text_files(wrf_dir, forc_dir):
+    """
+    List of (source, model, run, text path, layout) of the raw VIC-WRF files:
+      vicwrf_flux:  <wrf_dir>/<model>/<run>/flux_... for every run of every model, except the sim_avg directories
+                    left by the text version of export_VICWRF_avgs.py, as run averages are now computed in the store
+      wrf_forcing:  <forc_dir>/<model>/forc_..., stored as run 'forcing'
+    """
+    files = []
+    for model_dir in sorted(Path(wrf_dir).iterdir()):
+        for run_dir in sorted(p for p in model_dir.iterdir() if p.is_dir()) if model_dir.is_dir() else []:
+            if run_dir.name != 'sim_avg' and (run_dir / VICWRF_FLUX['file']).exists():
+                files.append(('vicwrf_flux', model_dir.name, run_dir.name, run_dir / VICWRF_FLUX['file'], VICWRF_FLUX))
+    for model_dir in sorted(Path(forc_dir).iterdir()):
+        if (model_dir / WRF_FORCING['file']).exists():
+            files.append(('wrf_forcing', model_dir.name, 'forcing', model_dir / WRF_FORCING['file'], WRF_FORCING))
+    return files
+
+
+def _ingest_job(job):
+    root, source, model, run, text_path, layout, overwrite = job
+    return (source, model, run), ClimateStore(root).ingest_text(source, model, run, text_path, layout, overwrite)
+
+
+def ingest_text_files(store, files, processes=None, overwrite=False):
+    """
+    Ingests a list of (source, model, run, text path, layout) in parallel, e.g. from vicwrf_text_files().
+    Returns the keys that were (re-)ingested
+    Scripts calling this must do so under `if __name__ == '__main__':`, as worker processes re-import them on Windows
+    """
+    jobs = [(store.root, *f, overwrite) for f in files]
+    if processes == 1:
+        results = [_ingest_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(_ingest_job, jobs))
+    return [key for key, ingested in results if ingested]
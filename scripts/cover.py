@@ -1,50 +1,23 @@
 # Formats cover source rasters (NLCD, CCAP, etc.) to the same projection, resolution, and extent of the DEM
-# Script written in Python 2.7, not compatible with Python 3.X
+# Each raster is clipped to the buffered study area, reprojected and snapped to the DEM grid in one warp (see warp.py)
+# Script written in Python 3.7
 
-import arcpy
-from arcpy import env
-import tempfile
 import config as config
-import imp
-from utils import reshape, getDEMspecs, getROI, velma_format
-imp.reload(config)
-arcpy.CheckOutExtension('Spatial')
-# ======================================================================================================================
-# Create temp directory for intermediary files
-tmp_dir = tempfile.mkdtemp()
-
-# Set environment settings
-env.workspace = tmp_dir  # Set to temp so that rasters created during velma_format are deleted
-arcpy.env.overwriteOutput = True
+import importlib
+from warp import DEMGrid, roi_bounds, reshape_layers
+importlib.reload(config)
 
-# =======================================================================
+# ======================================================================================================================
 # Clip to study area buffer, reproject, resample rasters
 # =======================================================================
 
-# Fetch study area and buffer
-cell_size = config.cell_size
-proj = str(config.proj_wkt)
-roi = str(config.study_area)
-dem_velma = str(config.dem_velma)
-roi_layers = getROI(roi, tmp_dir, proj)
-
-dem_specs = getDEMspecs(dem_velma)
-
-# NLCD Land Cover
-nlcd_tmp = tmp_dir + '/nlcd.tif'
-reshape(config.nlcd, nlcd_tmp, 'nlcd_landcover', 'NEAREST', dem_specs, cell_size, proj, tmp_dir, roi_layers)
-try:
-    config.nlcd_velma.parents[0].mkdir(parents=True)
-except WindowsError:
-    pass
-velma_format(nlcd_tmp, config.nlcd_velma)
-
+if __name__ == '__main__':
+    grid = DEMGrid(config.dem_velma, crs=config.proj_wkt)
+    bounds = roi_bounds(config.study_area, grid.crs, buffer=3000)
 
-# NOAA C-CAP
-ccap_tmp = tmp_dir + '/ccap.tif'
-reshape(config.noaa_ccap, ccap_tmp, 'noaa_ccap', 'NEAREST', dem_specs, cell_size, proj, tmp_dir, roi_layers)
-try:
-    config.noaa_ccap_velma.parents[0].mkdir(parents=True)
-except WindowsError:
-    pass
-velma_format(ccap_tmp, config.noaa_ccap_velma)
\ No newline at end of file
+    # NoData cells take the nearest land cover class (see gap_fill.py) instead of class 1, as utils.velma_format did
+    layers = [{'name': 'nlcd_landcover', 'in_path': config.nlcd, 'out_path': config.nlcd_velma,
+               'resampling': 'nearest', 'fill': {'strategy': 'nearest'}},
+              {'name': 'noaa_ccap', 'in_path': config.noaa_ccap, 'out_path': config.noaa_ccap_velma,
+               'resampling': 'nearest', 'fill': {'strategy': 'nearest'}}]
+    reshape_layers(layers, grid, bounds)
@@ -1,43 +1,67 @@
 # This script takes the current cover age map and adjusts it to include any disturbances found in the
-# Hansen Forest Loss dataset. The exported cover age map correponds to the desired VELMA simulation start date
+# Hansen Forest Loss dataset. An age map is exported for each VELMA simulation start date in sim_starts, e.g. 2004 for
+# the calibration runs and 2020 for the scenario runs, all computed from one read of the input maps
 # Script written in Python 3.7
 
 import config as config
 import numpy as np
-from soil_merger import readHeader
+import pandas as pd
+from grid_io import read_grid, write_grid
 
 # ======================================================================================================================
+# Config
 
 # Date of current cover age map
 current_map_date = 2020
 
-# Date of VELMA simulation start
-sim_start = 2020
-
-# Map of Hansen forest loss disturbances. Value = year of disturbance
-yearly_loss_path = config.yearly_forest_loss_velma
-yearly_loss = np.loadtxt(yearly_loss_path, skiprows=6)
-years = np.unique(yearly_loss)
-
-# Remove disturbances that occur after simulation start date, because they won't have occurred yet
-yearly_loss_sim = yearly_loss.copy()
-yearly_loss_sim[yearly_loss_sim >= sim_start % 100] = 0
-losses_occurred = (yearly_loss_sim != 0)
-
-# Override current cover age map with Hansen loss map, only where losses occurred before simulation start date
-current_cover_age_path = config.cover_age_velma
-current_cover_age = np.loadtxt(current_cover_age_path, skiprows=6)
-cover_age_updated = current_cover_age.copy()
-elapsed_time = current_map_date % 100 - losses_occurred
-cover_age_updated[losses_occurred] = elapsed_time[losses_occurred]
-
-# Bring updated age map to desired simulation start date
-historical_cover_age_sim = cover_age_updated + (sim_start % 100 - current_map_date % 100)
-
-# Export updated, historical cover age map for the simulation start date
-header = readHeader(config.cover_age_velma)
-outfile = config.cover_age_velma.parents[0] / 'historical_age_{}.asc'.format(sim_start)
-f = open(outfile, 'w')
-f.write(header)
-np.savetxt(f, historical_cover_age_sim, fmt='%i')
-f.close()
+# Dates of VELMA simulation start
+sim_starts = [2004, 2020]
+
+
+def project_cover_age(current_age, loss_code, current_map_date, sim_starts, nodata=-9999):
+    """
+    Returns an int16 stack of cover age maps, one per simulation start year, and a DataFrame of checks per year
+    Cells with a Hansen loss (coded as year - 2000) before the start year are aged from the loss: start - loss year.
+    All other cells take the current age moved to the start year: current age + start - current_map_date
+    """
+    valid = current_age != nodata
+    loss_year = np.where(loss_code > 0, 2000 + loss_code, 0).astype(np.int16)
+    starts = np.asarray(sim_starts, dtype=np.int16)[:, None, None]
+
+    losses_occurred = (loss_year > 0) & (loss_year < starts)
+    ages = np.where(losses_occurred, starts - loss_year, current_age + (starts - current_map_date))
+    ages = np.where(valid, ages, nodata).astype(np.int16)
+
+    # Stands the inventory says are older than the time since their Hansen loss
+    inventory_mismatch = int((valid & (loss_year > 0) & (current_age > current_map_date - loss_year)).sum())
+    checks = pd.DataFrame({'sim_start': sim_starts,
+                           'loss_cells': (losses_occurred & valid).sum(axis=(1, 2)),
+                           'negative_age_cells': ((ages < 0) & valid).sum(axis=(1, 2)),
+                           'min_age': [a[valid].min() if valid.any() else None for a in ages],
+                           'max_age': [a[valid].max() if valid.any() else None for a in ages]})
+    checks['inventory_mismatch_cells'] = inventory_mismatch
+    return ages, checks
+
+
+# =======================================================================
+
+if __name__ == '__main__':
+    # Map of Hansen forest loss disturbances. Value = year of disturbance - 2000
+    yearly_loss = read_grid(config.yearly_forest_loss_velma, dtype=np.int16)[0]
+    current_cover_age, header = read_grid(config.cover_age_velma, dtype=np.int16)
+    nodata = header.nodata if header.nodata is not None else -9999
+
+    # Override current cover age map with Hansen loss map, only where losses occurred before simulation start date,
+    # then bring the age map to each simulation start date.
+    # This used to set loss cells to current_map_date % 100 - losses_occurred, where losses_occurred is a boolean
+    # mask, so every loss cell got age 19 whatever its loss year. Ages are now counted from the loss year
+    ages, checks = project_cover_age(current_cover_age, yearly_loss, current_map_date, sim_starts, nodata=nodata)
+    print(checks.to_string(index=False))
+    if (checks['negative_age_cells'] > 0).any():
+        print('Warning: negative ages, where the current map has stands younger than the time back to a start date')
+
+    # Export updated, historical cover age maps for the simulation start dates
+    for sim_start, age_map in zip(sim_starts, ages):
+        outfile = config.cover_age_velma.parents[0] / 'historical_age_{}.asc'.format(sim_start)
+        write_grid(outfile, age_map, header, fmt='%i')
+    checks.to_csv(config.cover_age_velma.parents[0] / 'historical_age_checks.csv', index=False)
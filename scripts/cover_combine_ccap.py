@@ -1,10 +1,13 @@
 # Combines ccap and stand cover layers
+# Classes are reclassified with one lookup table per layer (see reclassify.py)
+# Processed in bands of rows so that it runs in bounded memory on high resolution (e.g. 1m) grids
 # Script written in Python 3.7
 
 import config as config
 import numpy as np
-import pandas as pd
-from soil_merger import readHeader
+from grid_io import read_header
+from grid_tiles import iter_tiles, GridStreamWriter
+from reclassify import load_classes, read_cover_key, reclassify
 import importlib
 
 importlib.reload(config)
@@ -18,91 +21,46 @@ importlib.reload(config)
 # ================================
 # Stands
 stands_path = str(config.cover_type_velma)
-cover_key = pd.read_csv(str(config.cover_type_velma.parents[0] / 'cover_type_key.csv'))
-stands = np.loadtxt(stands_path, skiprows=6)
+cover_key = read_cover_key(config.cover_type_velma.parents[0] / 'cover_type_key.csv')
+header = read_header(stands_path)
 outfile = config.cover_type_ccap_merge_velma
+conifer_outfile = config.cover_type_ccap_merge_velma.parents[0] / 'conifer.asc'
+tile_rows = 1024  # Rows of each grid held in memory at once
 
 # ================================
-# NOAA C-CAP
+# NOAA C-CAP and NLCD, with class definitions shared with cover_permeability.py and landcover_composition.py
 ccap_path = str(config.noaa_ccap_velma)
-ccap = np.loadtxt(ccap_path, skiprows=6)
-ccap = ccap + 100
-
-# CCAP class values
-ccap_NA = 100
-ccap_herby = 101
-ccap_dirt = 102
-ccap_developed = 103
-ccap_water = 104
-ccap_forest = 105
-ccap_shrub = 106
-
-# ================================
-# NLCD
 nlcd_path = str(config.nlcd_velma)
-stands_path = str(config.cover_type_velma)
-cover_key = pd.read_csv(str(config.cover_type_velma.parents[0] / 'cover_type_key.csv'))
-nlcd = np.loadtxt(nlcd_path, skiprows=6)
-
-nlcd = nlcd + 100
-
-# NLCD class values
-nlcd_open_water = 111
-nlcd_dev_openspace = 121
-nlcd_dev_low = 122
-nlcd_dev_med = 123
-nlcd_dev_high = 124
-nlcd_barren = 131
-nlcd_forest_decid = 141
-nlcd_forest_evergreen = 142
-nlcd_forest_mixed = 143
-nlcd_shrub = 152
-nlcd_herby = 171
-nlcd_woody_wet = 190
-nlcd_emerg_herb_wet = 195
+ccap_classes = load_classes('ccap')
+nlcd_classes = load_classes('nlcd')
 
 # ================================
 # Convert and merge landcover classes
-
-# Stand class values
-bare_id = cover_key.loc[cover_key['type'] == 'BARE', 'id'].iloc[0]
-bpa_id = cover_key.loc[cover_key['type'] == 'BPA', 'id'].iloc[0]
-nf_id = cover_key.loc[cover_key['type'] == 'NF', 'id'].iloc[0]
-conifer_id = cover_key.loc[cover_key['type'] == 'conifer', 'id'].iloc[0]
-
-# Replace CCAP developed and dirt with conifer
-ccap[(ccap == ccap_developed)] = conifer_id
-
-# Replace CCAP forest with conifer
-ccap[(ccap == ccap_forest)] = conifer_id
-
-# Replace bare, bpa, and nf that were in stands with conifer
-ccap[(ccap == bare_id)] = conifer_id
-ccap[(ccap == bpa_id)] = conifer_id
-ccap[(ccap == nf_id)] = conifer_id
-
-# Overlay NLCD deciduous forests on CCAP
-ccap[(nlcd == nlcd_forest_decid)] = nlcd_forest_decid
-
-# Replace CCAP shrub, herbaceous, dirt, and water with conifer
-ccap[(ccap == ccap_herby)] = conifer_id
-ccap[(ccap == ccap_shrub)] = conifer_id
-ccap[(ccap == ccap_dirt)] = conifer_id
-ccap[(ccap == ccap_water)] = conifer_id
-
-header = readHeader(stands_path)
-f = open(outfile, "w")
-f.write(header)
-np.savetxt(f, ccap, fmt="%i")
-f.close()
-
-# Create cover type map that is just conifer
-conifer = (ccap * 0) + 1
-outfile = config.cover_type_ccap_merge_velma.parents[0] / 'conifer.asc'
-f = open(outfile, "w")
-f.write(header)
-np.savetxt(f, conifer, fmt='%i')
-f.close()
+conifer_id = cover_key.id('conifer')
+
+# One lookup table from raw CCAP values to merged cover ids: CCAP classes take their id (value + 100), then
+# developed, forest, shrub, herbaceous, dirt and water, and the bare, bpa and nf stand ids, are replaced with conifer
+to_conifer = [ccap_classes.id(name) for name in ['developed', 'forest', 'herby', 'shrub', 'dirt', 'water']]
+to_conifer += [cover_key.id(name) for name in ['BARE', 'BPA', 'NF']]
+remap = np.arange(256, dtype=np.uint8)
+remap[to_conifer] = conifer_id
+ccap_lut = remap[ccap_classes.lut()]
+
+# NLCD deciduous forest is overlaid on CCAP
+decid_id = nlcd_classes.id('forest_decid')
+
+# Merge covers one band of rows at a time
+with GridStreamWriter(outfile, header, fmt="%i") as out, \
+        GridStreamWriter(conifer_outfile, header, fmt='%i') as conifer_out:
+    for tile in iter_tiles([ccap_path, nlcd_path], tile_rows=tile_rows, dtypes=np.uint8):
+        ccap, nlcd = tile.data
+        decid = nlcd_classes.is_class(nlcd, ['forest_decid'])  # NODATA NLCD cells are read as 0, so never deciduous
+        merged = reclassify(ccap, ccap_lut, overlays=[(decid, decid_id)], classes=ccap_classes)
+        # NODATA CCAP cells stay NODATA, unless NLCD deciduous forest is overlaid on them
+        out.write(np.ma.MaskedArray(merged, mask=tile.masks[0] & ~decid))
+
+        # Create cover type map that is just conifer
+        conifer_out.write(np.ones_like(merged))
 
 # # Merge key files
 # ccap_key = pd.read_csv(config.ccap_out.parents[0] / 'ccap_classes.csv')
@@ -1,79 +1,43 @@
-# Create cover permeability layer
+# Create cover permeability layer, and optionally a sweep of permeability maps for calibration
+# Processed in bands of rows so that it runs in bounded memory on high resolution (e.g. 1m) grids (see permeability.py)
 # Script written in Python 3.7
 
 import config as config
-import numpy as np
-import pandas as pd
-from scipy import ndimage
-from soil_merger import readHeader
+from permeability import build_permeability, sweep_outputs
 import importlib
 
 importlib.reload(config)
 # ======================================================================================================================
 
 # =======================================================================
-# Load data
+# Config
 # =======================================================================
-# Imports
 
-# ================================
-# Stands
-stands_path = str(config.cover_type_velma)
-cover_key = pd.read_csv(str(config.cover_type_velma.parents[0] / 'cover_type_key.csv'))
-stands = np.loadtxt(stands_path, skiprows=6)
-outfile = config.cover_type_velma.parents[0] / 'permeability.asc'
-
-# ================================
-# NOAA C-CAP
 ccap_path = str(config.noaa_ccap_velma)
-ccap = np.loadtxt(ccap_path, skiprows=6)
-ccap = ccap + 100
-
-# CCAP class values
-ccap_NA = 100
-ccap_herby = 101
-ccap_dirt = 102
-ccap_developed = 103
-ccap_water = 104
-ccap_forest = 105
-ccap_shrub = 106
-
-# ================================
-# NLCD
 nlcd_path = str(config.nlcd_velma)
-nlcd = np.loadtxt(nlcd_path, skiprows=6)
+tile_rows = 1024  # Rows of each grid held in memory at once
 
-nlcd = nlcd + 100
-
-# NLCD class values
-nlcd_open_water = 111
-nlcd_dev_openspace = 121
-nlcd_dev_low = 122
-nlcd_dev_med = 123
-nlcd_dev_high = 124
-nlcd_barren = 131
-nlcd_forest_decid = 141
-nlcd_forest_evergreen = 142
-nlcd_forest_mixed = 143
-nlcd_shrub = 152
-nlcd_herby = 171
-nlcd_woody_wet = 190
-nlcd_emerg_herb_wet = 195
+# Permeability layer used by VELMA
+outfile = config.cover_type_velma.parents[0] / 'permeability.asc'
+perm_fraction = 0.5  # Permeability of roads
+road_erosion = 1  # Cells NLCD roads are eroded by
 
-# Erode NLCD roads by 1 pixel - they look to be about 10-20m, not 30m
-road_mask = (nlcd == nlcd_dev_openspace) + (nlcd == nlcd_dev_low)
-roads = ndimage.binary_erosion(road_mask, iterations=1)
+# Sweep of road permeabilities and erosions for calibration, written to sweep_dir with manifest.csv. Empty to skip
+sweep_dir = config.cover_type_velma.parents[0] / 'permeability_sweep'
+sweep_fractions = []  # e.g. [0.1, 0.25, 0.5, 0.75]
+sweep_erosions = [0, 1, 2]
 
-# Combine CCAP developed with NLCD roads
-roads_merge = roads + (ccap == ccap_developed) + (ccap == ccap_dirt)
+# =======================================================================
+# Create permeability maps
+# =======================================================================
+# All maps are written in one pass over the inputs. perm_fraction used to be ignored, with roads always set to 0.5
 
-# Convert to % permeability
-perm_fraction = 0.5  # % permeability of roads
-perm = np.invert(roads_merge) * 1
-perm = np.where(perm == 0, 0.5, perm)
+outputs = [(outfile, perm_fraction, road_erosion)]
+if sweep_fractions:
+    sweep_dir.mkdir(parents=True, exist_ok=True)
+    outputs += sweep_outputs(sweep_dir, sweep_fractions, sweep_erosions)
 
-header = readHeader(nlcd_path)
-f = open(outfile, "w")
-f.write(header)
-np.savetxt(f, perm, fmt="%f")
-f.close()
+manifest = build_permeability(ccap_path, nlcd_path, outputs, tile_rows=tile_rows)
+print(manifest.to_string(index=False))
+if sweep_fractions:
+    manifest.iloc[1:].to_csv(sweep_dir / 'manifest.csv', index=False)
@@ -1,61 +1,43 @@
 # Rasterizes stand shapefiles into separate rasters of age, type, and VELMA ID
+# The stand polygons are burned once, and each attribute raster is looked up from that grid (see
+# stand_index.rasterize_attributes), so all layers have exactly the same stand boundaries
 # Script written in Python 3.7
 
 import config as config
-import numpy as np
 import geopandas as gpd
 import rasterio
-from rasterio import features
+from stand_index import rasterize_attributes
 # ======================================================================================================================
+# Config
+
+# Attribute columns of the stand shapefile to rasterize, and their output files. Any other column can be added
+stand_layers = {'SPECIES_ID': config.cover_type,
+                'Age_2020': config.cover_age,
+                'VELMA_ID': config.stand_id_velma}
+
+# =======================================================================
 # Import stand shapefile
 stand_shp = gpd.read_file(config.stand_shp.parents[0] / 'Ellsworth_Stands_updated.shp')
 
 # Import projection .wkt file used for all spatial files
 proj = open(config.proj_wkt, 'r').read()
 
-# Rasterize stand type
-stand_type = str(config.cover_type)
-# Take DEM and set all values to NaN, then burn species shp into empty DEM raster
 dem_file = config.dem_velma
-with rasterio.open(dem_file, 'r') as src:
-    in_arr = src.read(1)
-    in_arr[:] = -9999
-    meta = src.meta.copy()
-    meta = src.meta
-    with rasterio.open(stand_type, 'w+', **meta) as out:
-        shapes = ((geom, value) for geom, value in zip(stand_shp.geometry, stand_shp.SPECIES_ID))
-        burned = features.rasterize(shapes=shapes, fill=np.nan, out=in_arr, transform=out.transform)
-        out.write_band(1, burned)
-        out.crs = proj
 
-# Rasterize stand age
-stand_age = str(config.cover_age)
-# Take DEM and set all values to NaN, then burn species shp into empty DEM raster
-with rasterio.open(dem_file, 'r') as src:
-    in_arr = src.read(1)
-    in_arr[:] = -9999
-    meta = src.meta.copy()
-    meta = src.meta
-    with rasterio.open(stand_age, 'w+', **meta) as out:
-        shapes = ((geom, value) for geom, value in zip(stand_shp.geometry, stand_shp.Age_2020))
-        burned = features.rasterize(shapes=shapes, fill=np.nan, out=in_arr, transform=out.transform)
-        out.write_band(1, burned)
-        out.crs = proj
 
-# Rasterize stand id
-stand_id = str(config.stand_id_velma)
-# Take DEM and set all values to NaN, then burn species shp into empty DEM raster
-with rasterio.open(dem_file, 'r') as src:
-    in_arr = src.read(1)
-    in_arr[:] = -9999
-    meta = src.meta.copy()
-    meta = src.meta
-    with rasterio.open(stand_id, 'w+', **meta) as out:
-        shapes = ((geom, value) for geom, value in zip(stand_shp.geometry, stand_shp.VELMA_ID))
-        burned = features.rasterize(shapes=shapes, fill=np.nan, out=in_arr, transform=out.transform)
-        out.write_band(1, burned)
+def write_like_dem(outfile, arr):
+    # Written with the DEM's format and grid, cells outside polygons are -9999
+    with rasterio.open(dem_file, 'r') as src:
+        meta = src.meta.copy()
+    with rasterio.open(str(outfile), 'w+', **meta) as out:
+        out.write_band(1, arr.astype(meta['dtype']))
         out.crs = proj
 
+
+# Rasterize stand type, age and id
+for column, grid in rasterize_attributes(stand_shp, dem_file, list(stand_layers)).items():
+    write_like_dem(stand_layers[column], grid)
+
 # =======================================================================
 # Rasterize experimental basins
 
@@ -65,13 +47,4 @@ treatment_map = {'Passive': 0,
                  'Active': 2}
 exp_basins = exp_basins.replace({'TREATMENT': treatment_map})
 
-with rasterio.open(dem_file, 'r') as src:
-    in_arr = src.read(1)
-    in_arr[:] = -9999
-    meta = src.meta.copy()
-    meta = src.meta
-    with rasterio.open(config.exp_basins_velma, 'w+', **meta) as out:
-        shapes = ((geom, value) for geom, value in zip(exp_basins.geometry, exp_basins.TREATMENT))
-        burned = features.rasterize(shapes=shapes, fill=np.nan, out=in_arr, transform=out.transform)
-        out.write_band(1, burned)
-        out.crs = proj
+write_like_dem(config.exp_basins_velma, rasterize_attributes(exp_basins, dem_file, ['TREATMENT'])['TREATMENT'])
@@ -0,0 +1,129 @@
+# Compact storage of disturbance filter maps, in place of one full-grid binary .asc per year
+# A DisturbanceSchedule holds every filter map of a disturbance series (e.g. historical_clearcut_{year}.asc) as a
+# sparse list of disturbed cells per map key, grouped CSR style: the cells of map keys[k] are
+# cells[indptr[k]:indptr[k + 1]], as flat indices into the grid. Most cells of a filter map are 0, so a whole series
+# fits in one small .npz. The .asc files VELMA reads are written on demand, only for the maps that the
+# filterMapFullName entries of the simulation XML files actually reference (see expand_filter_maps.py)
+# Script written in Python 3.7
+
+import json
+import os
+import re
+import numpy as np
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from grid_io import GridHeader, write_grid
+
+# ======================================================================================================================
+
+
+class DisturbanceSchedule:
+    """ Series of binary filter maps, stored as the disturbed cells of each map """
+
+    def __init__(self, keys, indptr, cells, header, pattern):
+        self.keys = [int(key) for key in keys]
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.cells = np.asarray(cells, dtype=np.int64)
+        self.header = header
+        self.pattern = pattern  # File name of each map, with {} for its key, e.g. 'historical_clearcut_{}.asc'
+
+    @classmethod
+    def from_maps(cls, maps, header, pattern):
+        """ From a dict of {key: grid}. Nonzero cells are disturbed. Maps with no disturbed cells are dropped """
+        keys, cells = [], []
+        for key in sorted(maps):
+            disturbed = np.flatnonzero(np.asarray(maps[key]).ravel())
+            if disturbed.size:
+                keys.append(key)
+                cells.append(disturbed)
+        indptr = np.concatenate([[0], np.cumsum([len(c) for c in cells])]).astype(np.int64)
+        cells = np.concatenate(cells) if cells else np.array([], dtype=np.int64)
+        return cls(keys, indptr, cells, header, pattern)
+
+    @classmethod
+    def from_events(cls, cells, keys, header, pattern):
+        """ From parallel arrays of flat cell indices and map keys, one pair per disturbance. Duplicates are dropped """
+        events = np.unique(np.stack([np.asarray(keys, dtype=np.int64), np.asarray(cells, dtype=np.int64)]), axis=1)
+        unique_keys, counts = np.unique(events[0], return_counts=True)
+        return cls(unique_keys, np.concatenate([[0], np.cumsum(counts)]), events[1], header, pattern)
+
+    @classmethod
+    def from_key_grid(cls, key_grid, header, pattern):
+        """ From a grid of the (single) map key of each disturbed cell, e.g. a first harvest year grid. 0 = never """
+        flat = np.asarray(key_grid).ravel()
+        disturbed = np.flatnonzero(flat)
+        return cls.from_events(disturbed, flat[disturbed], header, pattern)
+
+    def save(self, path):
+        tmp_path = str(path) + '.{}.tmp'.format(os.getpid())
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, keys=np.array(self.keys, dtype=np.int64), indptr=self.indptr, cells=self.cells,
+                                header=json.dumps(self.header.to_dict()), pattern=self.pattern)
+        os.replace(tmp_path, str(path))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(str(path)) as data:
+            return cls(data['keys'], data['indptr'], data['cells'], GridHeader(**json.loads(str(data['header']))),
+                       str(data['pattern']))
+
+    def map(self, key):
+        """ Binary filter map of a key, all 0 if the key has no disturbed cells """
+        out = np.zeros(self.header.shape, dtype=np.uint8)
+        if key in self.keys:
+            k = self.keys.index(key)
+            out.flat[self.cells[self.indptr[k]:self.indptr[k + 1]]] = 1
+        return out
+
+    def first_key_grid(self, dtype=np.int16):
+        """ Grid of the first map key disturbing each cell (0 = never), e.g. the first harvest year """
+        out = np.zeros(self.header.shape, dtype=dtype)
+        for k in reversed(range(len(self.keys))):
+            out.flat[self.cells[self.indptr[k]:self.indptr[k + 1]]] = self.keys[k]
+        return out
+
+    def filename(self, key):
+        return self.pattern.format(key)
+
+    def key_from_filename(self, name):
+        """ Map key of a file name following this schedule's pattern, or None """
+        before, after = self.pattern.split('{}')
+        match = re.fullmatch(re.escape(before) + r'(\d+)' + re.escape(after), Path(name).name)
+        return int(match.group(1)) if match else None
+
+    def write_map(self, key, out_dir):
+        outfile = Path(out_dir) / self.filename(key)
+        write_grid(outfile, self.map(key), self.header, fmt='%i')
+        return outfile
+
+
+def referenced_filter_maps(xml_paths):
+    """ Set of filterMapFullName paths in VELMA XML files, relative to the input data directory """
+    names = set()
+    for xml_path in xml_paths:
+        root = ET.parse(str(xml_path)).getroot()
+        names.update(item.text.strip() for item in root.iter('filterMapFullName') if item.text)
+    return names
+
+
+def expand_filter_maps(schedule_paths, xml_paths, data_dir, overwrite=False):
+    """
+    Writes the .asc filter maps that the XML files reference and the schedules hold. Filter map paths in the XML are
+    relative to data_dir (the VELMA input data directory). Maps that already exist and are newer than their schedule
+    are skipped unless overwrite is True. Returns the list of files written
+    """
+    referenced = referenced_filter_maps(xml_paths)
+    written = []
+    for schedule_path in schedule_paths:
+        schedule = DisturbanceSchedule.load(schedule_path)
+        schedule_mtime = os.stat(str(schedule_path)).st_mtime_ns
+        for name in sorted(referenced):
+            key = schedule.key_from_filename(name)
+            if key is None:
+                continue
+            outfile = Path(data_dir) / name
+            if not overwrite and outfile.exists() and os.stat(str(outfile)).st_mtime_ns >= schedule_mtime:
+                continue
+            outfile.parent.mkdir(parents=True, exist_ok=True)
+            written.append(schedule.write_map(key, outfile.parent))
+    return written
@@ -3,83 +3,26 @@
 # and the integers which will be affected by a disturbance. The exported filter maps from this script have 1 for pixels
 # included in a disturbance, 0 for those excluded. User then specifies 1 for 'initializeFilterIds' in disturbance
 # parameters.
+# Scenarios and their protected areas are defined in disturbance_scenarios.json (see filter_map_builder.py). To add a
+# management scenario, add it to the spec: masks already computed are reused from the cache
 # Script written in Python 3.7
 
 import config as config
-import numpy as np
-import tempfile
-from scipy import ndimage
-from utils import flowlines
-from soil_merger import readHeader
+from pathlib import Path
+from filter_map_builder import FilterMapBuilder
 
 # ======================================================================================================================
-# Create temp directory for intermediary files
-tmp_dir = tempfile.mkdtemp()
+# Config
+spec_path = Path(__file__).parent / 'disturbance_scenarios.json'
 
 filter_dir = config.stand_id_velma.parents[0] / 'filter_maps'
-try:
-    filter_dir.mkdir(parents=True)
-except FileExistsError:
-    pass
-
-# =======================================================================
-# WA requires a 10 meter no-management buffer around all streams, so will add those in with ID=0
-
-# Create flowlines raster and buffer it by 1 cell (10m/30ft)
-flow = flowlines(config.flowlines)
-flow.get_flowlines_ascii(tmp_dir)
-no_mgmt_buffer = ndimage.binary_dilation(flow.raster, iterations=1)
-
-# Overlay buffer on stand ID map
-stand_id_path = str(config.stand_id_velma)
-stand_id = np.loadtxt(stand_id_path, skiprows=6)  # Each stand has a different number
-stand_id[stand_id == -9999] = np.nan
-stand_id[no_mgmt_buffer] = 0
-
-# Import map of the Ellsworth Experimental Basins. Passive=0, Control=1, Active=2
-exp_basins = np.loadtxt(config.exp_basins_velma, skiprows=6)
-exp_basins[exp_basins == -9999] = np.nan
-
-# Marbled murrelet habitat is a protected area that can't be harvested
-murrelet = np.loadtxt(config.data_path / 'landcover' / 'murrelet_no_harvest.asc', skiprows=6)
-murrelet[murrelet == -9999] = np.nan
 
 # =======================================================================
 # Create (binary) disturbance filter maps for each forest management scenario
+# All stands can be cut except protected areas: cells outside stands, a 10 meter no-management buffer around all
+# streams (required by WA) and marbled murrelet habitat. The baseline scenario also excludes the control and active
+# Ellsworth Experimental Basins (Passive=0, Control=1, Active=2)
 
-# ===================================
-disturbance = 'industrial_clearcut'
-# All stands can be cut except protected areas
-filter_map = ((stand_id == 0) + (murrelet == 1))  # The excluded cells here are TRUE
-filter_map = np.invert(filter_map) * 1  # TRUE cells are inverted to false, and then binarized
-outfile = filter_dir / '{}.asc'.format(disturbance)
-f = open(outfile, 'w')
-header = readHeader(stand_id_path)
-f.write(header)
-np.savetxt(f, filter_map, fmt='%i')
-f.close()
-
-# ===================================
-disturbance = 'active_all'
-# All stands can be cut except protected areas
-filter_map = ((stand_id == 0) + (murrelet == 1))
-filter_map = np.invert(filter_map) * 1
-outfile = filter_dir / '{}.asc'.format(disturbance)
-f = open(outfile, 'w')
-header = readHeader(stand_id_path)
-f.write(header)
-np.savetxt(f, filter_map, fmt='%i')
-f.close()
-
-# ===================================
-disturbance = 'baseline'
-# Active experimental basins and all stands outside of basins can be cut, except protected areas
-filter_map = ((stand_id == 0) + (murrelet == 1) + (exp_basins == 1) + (exp_basins == 2))
-filter_map = np.invert(filter_map) * 1
-outfile = filter_dir / '{}.asc'.format(disturbance)
-f = open(outfile, 'w')
-header = readHeader(stand_id_path)
-f.write(header)
-np.savetxt(f, filter_map, fmt='%i')
-f.close()
-
+builder = FilterMapBuilder.from_config(config, spec_path)
+for outfile in builder.build(filter_dir):
+    print('Wrote', outfile)
@@ -0,0 +1,59 @@
+# Monte Carlo ensemble of the random yearly clearcut schedule in disturbances_randomize_clearcuts.py
+# Draws n_realizations seeded schedules in parallel. Each realization is stored as one int16 raster of the year each
+# cell is first harvested (0 = never), stacked into a single compressed .npz, rather than as ~80 binary .asc files.
+# A manifest records the seed of every realization and the stands and area harvested each year, and the full
+# schedules (including repeat harvests of the same stand) are written alongside
+# Script written in Python 3.7
+
+import config as config
+import numpy as np
+import geopandas as gpd
+from filter_map_builder import FilterMapBuilder
+from stand_index import StandIndex
+from harvest_schedule import ensemble
+
+# ======================================================================================================================
+# Config
+start_date = 2020  # Simulation start date
+end_date = 2099  # Simulation end date
+yearly_cut = 0.1  # We want to clearcut 10% max of stands each year
+clearcut_age = 35  # Age at which stands get cut
+n_realizations = 100  # Number of random schedules
+seed = 2020  # Realization i uses the i-th child of np.random.SeedSequence(seed)
+processes = None  # Worker processes, defaults to the number of CPUs
+
+if __name__ == '__main__':
+    # =======================================================================
+    # Protected areas, as in the industrial_clearcut scenario of disturbance_scenarios.json
+
+    builder = FilterMapBuilder.from_config(config)
+    protected = builder.filter_map('industrial_clearcut') == 0
+    header = builder.grid_header()
+
+    # =======================================================================
+    # Draw the schedules
+
+    stand_path = config.stand_shp.parents[0] / 'Ellsworth_Stands_updated.shp'
+    stand_shp = gpd.read_file(stand_path)
+    stand_index = StandIndex.from_shapefile(stand_path, config.dem_velma, id_field='VELMA_ID',
+                                            cache_dir=config.grid_cache_dir)
+    stack, schedules, areas = ensemble(stand_index, stand_shp['VELMA_ID'].values, stand_shp['Age_2020'].values,
+                                       n_realizations, seed, protected=protected, processes=processes,
+                                       start_date=start_date, end_date=end_date, yearly_cut=yearly_cut,
+                                       clearcut_age=clearcut_age)
+
+    # =======================================================================
+    # Export stack, schedules and manifest
+
+    out_dir = config.stand_id_velma.parents[0] / 'filter_maps' / 'random_35yr_clearcut_10pct_ensemble'
+    out_dir.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(str(out_dir / 'harvest_years.npz'), harvest_years=stack, header=header.to_text())
+    schedules[['realization', 'year', 'VELMA_ID']].to_csv(out_dir / 'schedules.csv', index=False)
+
+    stands_cut = schedules.groupby(['realization', 'year']).size().rename('stands').reset_index()
+    manifest = areas.merge(stands_cut, on=['realization', 'year'], how='outer').fillna(0)
+    manifest['area_km2'] = manifest['cells'] * header.cellsize ** 2 * 1e-6
+    manifest.insert(1, 'seed', seed)
+    manifest.insert(2, 'spawn_key', manifest['realization'])
+    manifest.to_csv(out_dir / 'manifest.csv', index=False)
+    print(manifest.groupby('year')['area_km2'].describe())
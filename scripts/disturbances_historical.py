@@ -4,7 +4,9 @@
 
 import config as config
 import numpy as np
-from soil_merger import readHeader
+from grid_io import read_header
+from grid_tiles import iter_tiles, GridStreamWriter
+from disturbance_schedule import DisturbanceSchedule
 import importlib
 
 importlib.reload(config)
@@ -21,51 +23,40 @@ try:
 except FileExistsError:
     pass
 
-hansen_yearly_loss = np.loadtxt(yearly_loss_path, skiprows=6)
-
-hansen_years = np.unique(hansen_yearly_loss).tolist()
-hansen_years.remove(0)
-
 # =======================================================================
 # Combine the Hansen forest loss maps with pre-2000 (pre-Hansen) disturbances estimated based on stand age data
+# A cell's stand was last cut when its age was 0, i.e. in end - age. That year is taken as a pre-Hansen cut if it falls
+# in start to end - 1. Hansen loss years are coded as year % 100 (0 = no loss)
+# The grids are streamed in bands of rows, keeping only the disturbed cells of each band, and the last cut year of
+# each cell is written as a single int16 raster
 
 start = 1984
 end = 2021
-age_diff = end - start
-
-cover_age = np.loadtxt(config.cover_age_velma, skiprows=6)
-age_count = cover_age - age_diff
-
-# Subtract age difference between start and end period from current age raster.
-# Age+1 each year, and cells are cut down when cells=0
-prehansen_cuts = []
-prehansen_years = []
-for year in range(start, end):
-    loss_map = (age_count == 0)
-    prehansen_cuts.append(loss_map)
-    prehansen_years.append(year)
-    age_count += 1
+tile_rows = 1024  # Rows of each grid held in memory at once
+
+header = read_header(config.cover_age_velma)
+event_cells, event_years = [], []
+with GridStreamWriter(filter_dir / 'historical_cut_year.asc', header, fmt='%i') as cut_year_out:
+    for tile in iter_tiles([config.cover_age_velma, yearly_loss_path], tile_rows=tile_rows,
+                           dtypes=[np.float64, np.float64]):
+        cover_age, hansen_code = tile.data
+        prehansen_year = end - cover_age
+        prehansen_year = np.where((prehansen_year >= start) & (prehansen_year < end), prehansen_year, 0)
+        hansen_year = start + np.mod(hansen_code - start, 100)
+        hansen_year = np.where((hansen_code > 0) & (hansen_year < end), hansen_year, 0)
+
+        offset = tile.row_off * header.ncols
+        for years in [prehansen_year, hansen_year]:
+            cells = np.flatnonzero(years)
+            event_cells.append(cells + offset)
+            event_years.append(years.ravel()[cells].astype(np.int16))
+        cut_year_out.write(np.maximum(prehansen_year, hansen_year).astype(np.int16))
 
 # Export historical clearcut filter maps
-header = readHeader(config.cover_age_velma)
-
-for i, year in enumerate(range(start, end)):
-    prehansen_loss = prehansen_cuts[prehansen_years.index(year)]
-    hansen_loss = (hansen_yearly_loss == year % 100) * 1
-    total_loss = hansen_loss + prehansen_loss
-    if total_loss.sum() > 0:
-        print(year)
-        outfile = filter_dir / 'historical_clearcut_{}.asc'.format(year)
-    f = open(outfile, "w")
-    f.write(header)
-    np.savetxt(f, total_loss, fmt="%i")
-    f.close()
-
-
-
-
-
-
-
-
+# Maps are stored together as one compact schedule. expand_filter_maps.py writes the historical_clearcut_{year}.asc
+# files that the VELMA XML files reference, one year at a time
 
+schedule = DisturbanceSchedule.from_events(np.concatenate(event_cells), np.concatenate(event_years), header,
+                                           'historical_clearcut_{}.asc')
+schedule.save(filter_dir / 'historical_clearcut.npz')
+print('Years with clearcuts:', schedule.keys)
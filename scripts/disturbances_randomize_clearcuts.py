@@ -5,46 +5,26 @@
 import pandas as pd
 import numpy as np
 import config as config
-import tempfile
-from scipy import ndimage
-from utils import flowlines
 import geopandas as gpd
-from soil_merger import readHeader
-import rasterio
-from rasterio import features
+from filter_map_builder import FilterMapBuilder
+from stand_index import StandIndex
+from harvest_schedule import random_clearcut_schedule
+from disturbance_schedule import DisturbanceSchedule
 # ======================================================================================================================
 # Config
 start_date = 2020  # Simulation start date
 end_date = 2099  # Simulation end date
 yearly_cut = 0.1  # We want to clearcut 10% max of stands each year
 clearcut_age = 35  # Age at which stands get cut
+seed = 2020  # Seed of the random stand sampling, so the schedule can be reproduced
 
 # =======================================================================
-# Import files to create protected areas
+# Protected areas: cells outside stands, the stream buffer and murrelet habitat, as in the industrial_clearcut scenario
+# of disturbance_scenarios.json. Masks are shared with disturbances.py through the cache (see filter_map_builder.py)
 
-# Create temp directory for intermediary files
-tmp_dir = tempfile.mkdtemp()
-
-# WA requires a 10 meter no-management buffer around all streams, so will add those in with ID=0
-# Create flowlines raster and buffer it by 1 cell (10m/30ft)
-flow = flowlines(config.flowlines)
-flow.get_flowlines_ascii(tmp_dir)
-no_mgmt_buffer = ndimage.binary_dilation(flow.raster, iterations=1)
-
-# Overlay buffer on stand ID map
-stand_id_path = str(config.stand_id_velma)
-stand_id = np.loadtxt(stand_id_path, skiprows=6)  # Each stand has a different number
-stand_id[stand_id == -9999] = np.nan
-stand_id[no_mgmt_buffer] = 0
-
-# Import map of the Ellsworth Experimental Basins. Passive=0, Control=1, Active=2
-exp_basins = np.loadtxt(config.exp_basins_velma, skiprows=6)
-exp_basins[exp_basins == -9999] = np.nan
-
-# Marbled murrelet habitat is a protected area that can't be harvested
-murrelet_path = config.data_path / 'landcover' / 'murrelet_no_harvest.asc'
-murrelet = np.loadtxt(murrelet_path, skiprows=6)
-murrelet[murrelet == -9999] = np.nan
+builder = FilterMapBuilder.from_config(config)
+protected = builder.filter_map('industrial_clearcut') == 0
+header = builder.grid_header()
 
 # =======================================================================
 # Create (binary) disturbance filter maps for each forest management scenario
@@ -56,36 +36,20 @@ stand_shp = gpd.read_file(config.stand_shp.parents[0] / 'Ellsworth_Stands_update
 
 # Randomly sample X% of eligible stands each year for clearcutting until all eligible stands are cut
 # For the rest of the VELMA simulation, stands will be cut whenever they become eligible
-stands = stand_shp.copy()
-yearly_samples = []
-for year in range(start_date, end_date):
-    eligible = stands[stands['Age_2020'] >= clearcut_age]
-    if len(eligible) == 0:
-        break
-    cut_number = int(np.ceil(len(stands) * yearly_cut))  # Number of stands to be harvested this year
-    to_harvest = np.min([cut_number, len(eligible)])  # If cut_number > # of eligible stands, cut all remaining stands
-    sample = eligible.sample(to_harvest)
-    yearly_samples.append(sample)
-    stands['Age_2020'] += 1
-    stands.loc[stands['VELMA_ID'].isin(sample['VELMA_ID']), 'Age_2020'] = 0  # Set age of harvested stands to 0
+schedule = random_clearcut_schedule(stand_shp['VELMA_ID'], stand_shp['Age_2020'], seed, start_date, end_date,
+                                    yearly_cut=yearly_cut, clearcut_age=clearcut_age)
+yearly_samples = [sample for year, sample in schedule.groupby('year')]
 
 
-# Rasterize harvest samples
-dem_file = config.dem_velma
+# Build harvest maps from the stand index. The stands are rasterized once (and cached), and each year's map is one
+# scatter of the cell indices of the sampled stands
+stand_index = StandIndex.from_shapefile(config.stand_shp.parents[0] / 'Ellsworth_Stands_updated.shp',
+                                        config.dem_velma, id_field='VELMA_ID', cache_dir=config.grid_cache_dir)
 yearly_clearcuts = []
 for stand in yearly_samples:
-    with rasterio.open(dem_file, 'r') as src:
-        template = src.read(1)
-        template[:] = 0
-        meta = src.meta.copy()
-        shapes = stand.geometry
-        harvest = features.rasterize(shapes=shapes, fill=0, out_shape=(src.height, src.width), out=template,
-                                    transform=src.transform, default_value=1)
-
-    protected = ((stand_id == 0) + (murrelet == 1))
-    harvest[protected.astype('bool')] = 0
+    harvest = stand_index.mask(stand['VELMA_ID']) & ~protected
     if np.sum(harvest) > 0:
-        yearly_clearcuts.append(harvest)
+        yearly_clearcuts.append(harvest.astype(np.uint8))
 
 
 # Export clearcut harvests
@@ -94,13 +58,11 @@ try:
     filter_dir.mkdir(parents=True)
 except FileExistsError:
     pass
-header = readHeader(dem_file)
-for i, harvest in enumerate(yearly_clearcuts):
-    outfile = filter_dir / 'random_35yr_clearcut_10pct_{}.asc'.format(i+1)
-    f = open(outfile, "w")
-    f.write(header)
-    np.savetxt(f, harvest, fmt="%i")
-    f.close()
+# Stored as one compact schedule. expand_filter_maps.py writes the random_35yr_clearcut_10pct_{i}.asc files that the
+# VELMA XML files reference
+schedule = DisturbanceSchedule.from_maps({i + 1: harvest for i, harvest in enumerate(yearly_clearcuts)}, header,
+                                         'random_35yr_clearcut_10pct_{}.asc')
+schedule.save(filter_dir / 'random_35yr_clearcut_10pct.npz')
 
 # # To check sizes of each yearly harvest
 # areas = []
@@ -0,0 +1,61 @@
+# Creates yearly clearcut filter maps from a schedule that follows WA forest practice constraints: stands are cut
+# oldest first, without creating openings (connected stands cut within the green-up period) larger than max_opening
+# and within a yearly harvest area cap. See harvest_scheduler.py. Output is in the same format as
+# disturbances_randomize_clearcuts.py, with the .asc files written by expand_filter_maps.py
+# Script written in Python 3.7
+
+import config as config
+import pandas as pd
+import geopandas as gpd
+from filter_map_builder import FilterMapBuilder
+from stand_index import StandIndex
+from harvest_scheduler import HarvestScheduler
+from disturbance_schedule import DisturbanceSchedule
+
+# ======================================================================================================================
+# Config
+start_date = 2020  # Simulation start date
+end_date = 2099  # Simulation end date
+clearcut_age = 35  # Age at which stands can be cut
+green_up = 5  # Years before a cut stand no longer counts towards an opening
+max_opening = 48.6  # Max size of an opening (ha), 120 acres
+max_area_per_year = None  # Max area harvested each year (ha), None for no cap
+min_boundary = 0  # Stands sharing this many metres of boundary or fewer aren't adjacent
+seed = 2020  # Seed of the tie-breaks between stands of the same age
+name = 'scheduled_35yr_clearcut'
+
+# =======================================================================
+# Protected areas, as in the industrial_clearcut scenario of disturbance_scenarios.json
+
+builder = FilterMapBuilder.from_config(config)
+protected = builder.filter_map('industrial_clearcut') == 0
+header = builder.grid_header()
+
+# =======================================================================
+# Schedule harvests
+
+stand_path = config.stand_shp.parents[0] / 'Ellsworth_Stands_updated.shp'
+stand_shp = gpd.read_file(stand_path)
+stand_index = StandIndex.from_shapefile(stand_path, config.dem_velma, id_field='VELMA_ID',
+                                        cache_dir=config.grid_cache_dir)
+ages = pd.Series(stand_shp['Age_2020'].values, index=stand_shp['VELMA_ID']).groupby(level=0).max()
+ages = ages.reindex(stand_index.ids).fillna(0).values
+
+scheduler = HarvestScheduler(stand_index, ages, header.cellsize, protected=protected, clearcut_age=clearcut_age,
+                             green_up=green_up, max_opening=max_opening, max_area_per_year=max_area_per_year,
+                             min_boundary=min_boundary, rng=seed)
+schedule = scheduler.run(start_date, end_date)
+print(schedule.groupby('year')['area_ha'].agg(['count', 'sum']).describe())
+
+# =======================================================================
+# Export, numbered in order like the random clearcut maps
+
+yearly_clearcuts = [stand_index.mask(stands['VELMA_ID']) & ~protected for year, stands in schedule.groupby('year')]
+yearly_clearcuts = [harvest for harvest in yearly_clearcuts if harvest.any()]
+
+filter_dir = config.stand_id_velma.parents[0] / 'filter_maps'
+filter_dir.mkdir(parents=True, exist_ok=True)
+maps = DisturbanceSchedule.from_maps({i + 1: harvest for i, harvest in enumerate(yearly_clearcuts)}, header,
+                                     name + '_{}.asc')
+maps.save(filter_dir / '{}.npz'.format(name))
+schedule.to_csv(filter_dir / '{}.csv'.format(name), index=False)
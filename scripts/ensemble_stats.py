@@ -0,0 +1,102 @@
+# Streaming statistics over the runs of climate ensembles held in the climate store (see climate_store.py)
+# Runs are read in a process pool and folded into running sums and counts (and optionally minima and maxima), so
+# memory stays at one run per worker however many runs a model has, instead of stacking every run before averaging.
+# Each worker accumulates a chunk of the runs of a model and the partial results are merged as they finish
+# Script written in Python 3.7
+
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from climate_store import ClimateStore
+
+# ======================================================================================================================
+
+
+class RunAccumulator:
+    """ Running sum, count, and optionally minimum and maximum, of runs sharing a time index and variables """
+
+    def __init__(self, extremes=False):
+        self.extremes = extremes
+        self.count = 0
+        self.index = None
+        self.columns = None
+        self.sum = None
+        self.min = None
+        self.max = None
+
+    def add(self, frame):
+        values = frame.to_numpy(dtype=np.float64)
+        if self.sum is None:
+            self.index, self.columns = frame.index, list(frame.columns)
+            self.sum = values.copy()
+            if self.extremes:
+                self.min, self.max = values.copy(), values.copy()
+        else:
+            self._check(frame.index, list(frame.columns))
+            self.sum += values
+            if self.extremes:
+                np.minimum(self.min, values, out=self.min)
+                np.maximum(self.max, values, out=self.max)
+        self.count += 1
+
+    def merge(self, other):
+        """ Adds the runs accumulated by another RunAccumulator, e.g. from a worker process """
+        if other.count == 0:
+            return
+        if self.sum is None:
+            self.__dict__.update(other.__dict__)
+            return
+        self._check(other.index, other.columns)
+        self.sum += other.sum
+        if self.extremes:
+            np.minimum(self.min, other.min, out=self.min)
+            np.maximum(self.max, other.max, out=self.max)
+        self.count += other.count
+
+    def _check(self, index, columns):
+        if columns != self.columns or not index.equals(self.index):
+            raise ValueError('Runs have different variables or time steps')
+
+    def _frame(self, values):
+        return pd.DataFrame(values, index=self.index, columns=self.columns)
+
+    def mean(self):
+        return self._frame(self.sum / self.count)
+
+    def minimum(self):
+        return self._frame(self.min)
+
+    def maximum(self):
+        return self._frame(self.max)
+
+
+def _accumulate_job(job):
+    root, source, model, runs, variables, extremes = job
+    store = ClimateStore(root)
+    acc = RunAccumulator(extremes)
+    for run in runs:
+        acc.add(store.read(source, model, run, variables=variables))
+    return model, acc
+
+
+def accumulate_runs(store, source, runs_by_model, variables=None, extremes=False, processes=None):
+    """
+    Accumulates the runs of each model of a source, given as {model: [runs]}. Returns {model: RunAccumulator}
+    Scripts calling this must do so under `if __name__ == '__main__':`, as worker processes re-import them on Windows
+    """
+    n_chunks = processes or os.cpu_count() or 1
+    jobs = [(store.root, source, model, chunk.tolist(), variables, extremes)
+            for model, runs in runs_by_model.items() if runs
+            for chunk in np.array_split(np.array(runs, dtype=object), min(n_chunks, len(runs)))]
+    results = {model: RunAccumulator(extremes) for model in runs_by_model}
+    if processes == 1:
+        for job in jobs:
+            model, acc = _accumulate_job(job)
+            results[model].merge(acc)
+        return results
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for future in as_completed([pool.submit(_accumulate_job, job) for job in jobs]):
+            model, acc = future.result()
+            results[model].merge(acc)
+    return results
@@ -0,0 +1,22 @@
+# Writes the disturbance filter maps (.asc) referenced by the VELMA simulation XML files from the compact schedules
+# saved by the disturbance scripts (see disturbance_schedule.py). Only maps named in a filterMapFullName entry are
+# written, and maps that are already up to date are skipped
+# Script written in Python 3.7
+
+import config as config
+import importlib
+from disturbance_schedule import expand_filter_maps
+importlib.reload(config)
+
+# ======================================================================================================================
+# Config
+xml_root = config.data_path.parents[0] / 'xml'
+filter_dir = config.stand_id_velma.parents[0] / 'filter_maps'
+overwrite = False
+
+# =======================================================================
+
+xml_paths = sorted(xml_root.rglob('*.xml'))
+schedule_paths = sorted(filter_dir.glob('*.npz'))
+written = expand_filter_maps(schedule_paths, xml_paths, config.velma_data, overwrite=overwrite)
+print('Wrote {} filter maps for {} XML files'.format(len(written), len(xml_paths)))
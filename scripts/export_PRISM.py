@@ -7,19 +7,22 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import mpld3
 import numpy as np
+from climate_store import ClimateStore
 # =======================================================================
 # Config
 start = pd.to_datetime('01-01-1984')
 end = pd.to_datetime('12-31-2020')
 
 # Average PRISM and Naselle gauge precipitation
-gauge = pd.read_csv(config.daily_ppt.parents[0] / 'GHCND_USC00455774_1929_2020.csv', parse_dates=True, index_col=5)
-gauge['SNOW'].fillna(0, inplace=True)
+# Daily records are read from the climate store (see ingest_climate.py)
+store = ClimateStore(config.climate_store)
+gauge = store.read('observed', 'ghcnd', 'USC00455774', variables=['PRCP', 'SNOW'])
+gauge['SNOW'] = gauge['SNOW'].fillna(0)
 gauge['SNOW_SWE'] = gauge['SNOW'] / 13
 gauge['PRCP_TOT'] = gauge['PRCP'] + gauge['SNOW_SWE']
 gauge_precip = gauge[['PRCP_TOT']]
 
-prism_precip = pd.read_csv(config.daily_ppt, parse_dates=True, index_col=0)
+prism_precip = store.read('observed', 'prism', 'ppt')
 
 # Expand precip record to full date range in case some days are missing
 rng = pd.date_range(start, end)
@@ -32,9 +35,7 @@ prism_precip_mean['avg_precip'] = prism_precip_mean.mean(axis=1)
 obs_p = prism_precip_mean.loc[:, ['avg_precip']]
 
 # Air temperature
-temp_path = config.daily_temp_mean
-temp = pd.read_csv(temp_path, parse_dates=True, index_col=0)
-obs_t = temp[(temp.index >= start) & (temp.index <= end)]
+obs_t = store.read('observed', 'prism', 'temp', start=start, end=end)
 
 # Export gauge and PRISM averaged precip
 outfile_p = str(config.velma_data / 'precip' / 'PRISM_{}_{}_gauge_avg_ppt.csv'.format(start.year % 100, end.year % 100))
@@ -1,105 +1,56 @@
 # This script takes VIC WRF files supplied by the University of Washington Climate Impacts Group
 # and exports precipitation and temperature averaged from the multiple climate simulation runs.
-# wrf_dir and frc_dir are directories where the projections (with temperature) and forcings (with precipitation)
-# files are located.
+# The runs are read from the climate store (run ingest_climate.py first) and averaged in a process pool with running
+# sums (see ensemble_stats.py), and the averages are written back to the store:
+#   vicwrf_flux/<model>/sim_avg: average of the runs of each model (and sim_min/sim_max if keep_extremes)
+#   summary/sim_avg/temp:        WRF forcing temperature of each model
+#   summary/sim_avg/ppt:         averaged VIC WRF precipitation of each model
 # Written in Python 3.7
 
 import __init__
 import scripts.config as config
-import numpy as np
 import pandas as pd
-import os
+from climate_store import ClimateStore
+from ensemble_stats import accumulate_runs
 
 # =======================================================================
-# Load raw VIC WRF climate files
+# Config
 
-wrf_dir = config.data_path / 'precip' / 'VIC_WRF_EllsworthCr'
-
-wrf_file = 'flux_46.40625_-123.90625'
-wrf_cols = ["YEAR", "MONTH", "DAY", "HOUR", "OUT_PREC", "OUT_PET_SHORT",
-            "OUT_SWE", "OUT_EVAP", "OUT_RUNOFF", "OUT_BASEFLOW",
-            "OUT_SOIL_MOIST0", "OUT_SOIL_MOIST1", "OUT_SOIL_MOIST2"]
-
-for sim_dir in os.listdir(wrf_dir):
-    runs = os.listdir(wrf_dir / sim_dir)
-    try:
-        runs.remove('sim_avg')
-    except ValueError:
-        pass
-    arrs = []
-    for run in runs:
-        arr = np.loadtxt(wrf_dir / sim_dir / run / wrf_file)
-        arrs.append(arr)
-    stack = np.dstack(arrs)
-    averaged = np.mean(stack, axis=2)
-    out_dir = wrf_dir / sim_dir / 'sim_avg'
-    try:
-        out_dir.mkdir(parents=True)
-    except FileExistsError:
-        pass
-    np.savetxt(out_dir / '{}.gz'.format(wrf_file), averaged)
+processes = None  # Worker processes, None for one per core
+keep_extremes = False  # Also store the minimum and maximum of the runs of each model
 
 # =======================================================================
-# Save averaged temp file
-forc_dir = config.data_path / 'precip' / 'WRF_frcs_EllsworthCr_forcings'
-
-forc_file = 'forc_46.40625_-123.90625'
-forc_cols = ['Year', 'Month', 'Day', 'Hour', 'Precip(mm)', 'Temp(C)',
-             'Wind(m/s)', 'SWrad(W/m2)', 'LWrad(W/m2)', 'pressure(kPa)',
-             'VaporPress(kPa)']
-
-cols = ['Temp(C)']
-inds = [forc_cols.index(x) for x in cols]
-arrs = []
-sim_dirs = []
-for sim_dir in os.listdir(forc_dir):
-    if sim_dir == 'pnnl_historical':
-        continue
-    sim_dirs.append(sim_dir)
-    arr = np.loadtxt(forc_dir / sim_dir / forc_file)
-    arrs.append(arr[:, inds])
-stack = np.column_stack(arrs)
-proj_sims_temp = pd.DataFrame(stack, columns=sim_dirs)
-date_arr = pd.DataFrame(arr, columns=forc_cols)
-proj_sims_temp = np.column_stack([date_arr[['Year', 'Month', 'Day']], stack])
-
-# Export just averaged temp to speed up imports in the future
-gcm_avg_forc_dir = forc_dir / 'sim_avg'
-try:
-    gcm_avg_forc_dir.mkdir(parents=True)
-except FileExistsError:
-    pass
-
-np.savetxt(gcm_avg_forc_dir / 'sim_avg_temp.gz', proj_sims_temp)
-
-# =======================================================================
-# Save averaged precip file
-
-wrf_file = 'flux_46.40625_-123.90625'
-wrf_cols = ["YEAR", "MONTH", "DAY", "HOUR", "OUT_PREC", "OUT_PET_SHORT",
-            "OUT_SWE", "OUT_EVAP", "OUT_RUNOFF", "OUT_BASEFLOW",
-            "OUT_SOIL_MOIST0", "OUT_SOIL_MOIST1", "OUT_SOIL_MOIST2"]
-
-cols = ['OUT_PREC']
-inds = [wrf_cols.index(x) for x in cols]
-arrs = []
-sim_dirs = []
-for sim_dir in os.listdir(wrf_dir):
-    if sim_dir == 'pnnl_historical':
-        continue
-    sim_dirs.append(sim_dir)
-    arr = np.loadtxt(wrf_dir / sim_dir / 'sim_avg' / '{}.gz'.format(wrf_file))
-    arrs.append(arr[:, inds])
-stack = np.column_stack(arrs)
-proj_sims_ppt = pd.DataFrame(stack, columns=sim_dirs)
-date_arr = pd.DataFrame(arr, columns=wrf_cols)
-proj_sims_ppt = np.column_stack([date_arr[['YEAR', 'MONTH', 'DAY']], stack])
-
-# Export just averaged temp to speed up imports in the future
-gcm_avg_dir = wrf_dir / 'sim_avg'
-try:
-    gcm_avg_dir.mkdir(parents=True)
-except FileExistsError:
-    pass
 
-np.savetxt(gcm_avg_dir / 'sim_avg_ppt.gz', proj_sims_ppt)
+if __name__ == '__main__':
+    store = ClimateStore(config.climate_store)
+
+    # =======================================================================
+    # Average the runs of each VIC WRF simulation
+
+    runs_by_model = {model: [run for run in store.runs('vicwrf_flux', model) if not run.startswith('sim_')]
+                     for model in store.models('vicwrf_flux')}
+    stats = accumulate_runs(store, 'vicwrf_flux', runs_by_model, extremes=keep_extremes, processes=processes)
+    for model, acc in stats.items():
+        if acc.count == 0:
+            continue
+        store.write('vicwrf_flux', model, 'sim_avg', acc.mean())
+        if keep_extremes:
+            store.write('vicwrf_flux', model, 'sim_min', acc.minimum())
+            store.write('vicwrf_flux', model, 'sim_max', acc.maximum())
+        print('{}: averaged {} runs'.format(model, acc.count))
+
+    # =======================================================================
+    # Save temp of every projection, one column per simulation
+
+    sim_dirs = [sim_dir for sim_dir in store.models('wrf_forcing') if sim_dir != 'pnnl_historical']
+    proj_sims_temp = pd.concat([store.read('wrf_forcing', sim_dir, 'forcing', variables=['Temp(C)'])['Temp(C)']
+                                for sim_dir in sim_dirs], axis=1, keys=sim_dirs)
+    store.write('summary', 'sim_avg', 'temp', proj_sims_temp)
+
+    # =======================================================================
+    # Save averaged precip of every projection, one column per simulation
+
+    sim_dirs = [sim_dir for sim_dir, acc in stats.items() if sim_dir != 'pnnl_historical' and acc.count]
+    proj_sims_ppt = pd.concat([store.read('vicwrf_flux', sim_dir, 'sim_avg', variables=['OUT_PREC'])['OUT_PREC']
+                               for sim_dir in sim_dirs], axis=1, keys=sim_dirs)
+    store.write('summary', 'sim_avg', 'ppt', proj_sims_ppt)
@@ -0,0 +1,35 @@
+# Fills NoData cells in the cover type, cover age, permeability and soil layers, which VELMA can't handle
+# Run after the layers have been resampled to the DEM grid and exported to ASCII. Replaces the ArcPy
+# utils.velma_format step, which set every NoData cell to 1 regardless of the layer
+# Script written in Python 3.7
+
+import config as config
+import pandas as pd
+from gap_fill import fill_grid_file
+import importlib
+
+importlib.reload(config)
+# ======================================================================================================================
+# Config
+tile_rows = 1024  # Rows of each grid held in memory at once
+max_distance = 100  # Cells further than this from any valid cell are left as NoData by the nearest strategy
+
+# Layer, fill strategy and strategy options. Layers are filled in place
+layers = [
+    (config.cover_type_velma, 'nearest', {'max_distance': max_distance}),
+    (config.cover_age_velma, 'majority', {'size': 3, 'iterations': 10}),
+    (config.velma_data / 'landcover' / 'permeability.asc', 'constant', {'value': 1, 'fmt': '%f'}),
+    (config.soil_velma, 'nearest', {'max_distance': max_distance}),
+]
+
+# =======================================================================
+# Fill gaps and report the number of cells filled with each class
+
+reports = []
+for path, strategy, options in layers:
+    report, unfilled = fill_grid_file(path, path, strategy=strategy, tile_rows=tile_rows, **options)
+    print('{}: {} cells filled ({}), {} left unfilled'.format(path.name, report.sum(), strategy, unfilled))
+    reports.append(report.reset_index().assign(layer=path.stem, strategy=strategy))
+
+reports = pd.concat(reports)[['layer', 'strategy', 'value', 'cells_filled']]
+reports.to_csv(config.velma_data / 'fill_nodata_report.csv', index=False)
@@ -0,0 +1,137 @@
+# Builds the disturbance filter maps of several management scenarios from a declarative spec (JSON, or YAML if
+# PyYAML is installed), e.g. disturbance_scenarios.json. The spec has three sections:
+#   layers:    input grids, by path and grid_io.read_layer schema
+#   masks:     boolean masks, either cells of a layer with given values ({"layer": ..., "values": [...]}) or a
+#              riparian buffer in metres around flowlines ({"flowlines": <shapefile>, "buffer_m": width})
+#   scenarios: for each scenario, masks to "include" (any of them; all cells if omitted) and to "exclude" (any of them)
+# Each mask is computed once, cached as .npy keyed on its spec and the contents of its inputs, and shared by every
+# scenario that uses it. Filter maps are 1 for cells that can be disturbed and 0 otherwise
+# Paths in the spec are formatted with the attributes of the config, so they can name config paths directly (e.g.
+# "{stand_id_velma}", "{flowlines}") or build on them (e.g. "{data_path}/landcover/...")
+# Script written in Python 3.7
+
+import hashlib
+import json
+import os
+import numpy as np
+from pathlib import Path
+from grid_io import read_layer, write_grid
+from grid_cache import GridCache, file_hash
+
+# ======================================================================================================================
+
+SPEC_PATH = Path(__file__).parent / 'disturbance_scenarios.json'
+
+
+def load_spec(path, config=None, **path_vars):
+    """
+    Reads a scenario spec, filling {name} placeholders in paths with the attributes of config, or with path_vars,
+    which take precedence
+    """
+    path_vars = {**(vars(config) if config is not None else {}), **path_vars}
+    path = Path(path)
+    with open(str(path), 'r') as f:
+        if path.suffix.lower() in ('.yaml', '.yml'):
+            import yaml
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+    for layer in spec['layers'].values():
+        layer['path'] = layer['path'].format(**path_vars)
+    for mask in spec['masks'].values():
+        if 'flowlines' in mask:
+            mask['flowlines'] = mask['flowlines'].format(**path_vars)
+    return spec
+
+
+class FilterMapBuilder:
+    """ Computes and caches the masks of a scenario spec and combines them into scenario filter maps """
+
+    def __init__(self, spec, cache_dir, dem_path):
+        self.spec = spec
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.dem_path = dem_path  # Grid the flowlines are rasterized onto
+        self.grid_cache = GridCache(cache_dir)
+        self.layers = {}
+        self.masks = {}
+        self.header = None
+
+    @classmethod
+    def from_config(cls, config, spec_path=SPEC_PATH):
+        """ Builder of a spec (disturbance_scenarios.json by default) with the paths, cache and DEM of the config """
+        return cls(load_spec(spec_path, config), config.grid_cache_dir, config.dem_velma)
+
+    def layer(self, name):
+        if name not in self.layers:
+            layer_spec = self.spec['layers'][name]
+            self.layers[name], header = read_layer(layer_spec['path'], layer_spec['schema'],
+                                                   reader=self.grid_cache.read_grid)
+            if self.header is None:
+                self.header = header
+            elif header != self.header:
+                raise ValueError('Layer {} does not match the grid of the other layers'.format(name))
+        return self.layers[name]
+
+    def grid_header(self):
+        """ Header of the grid, from the first layer in the spec """
+        if self.header is None:
+            self.layer(next(iter(self.spec['layers'])))
+        return self.header
+
+    def _mask_key(self, mask_spec):
+        # Cache key from the mask spec and the contents of the layer it is computed from
+        h = hashlib.blake2b(digest_size=16)
+        h.update(json.dumps(mask_spec, sort_keys=True).encode())
+        h.update(file_hash(self.spec['layers'][mask_spec['layer']]['path']).encode())
+        return h.hexdigest()
+
+    def _compute_mask(self, mask_spec):
+        layer = self.layer(mask_spec['layer'])
+        # NODATA cells of the layer are never in the mask
+        return np.isin(layer.data, mask_spec['values']) & ~np.ma.getmaskarray(layer)
+
+    def mask(self, name):
+        """ Boolean grid of a mask, from the cache if its inputs haven't changed """
+        if name not in self.masks:
+            mask_spec = self.spec['masks'][name]
+            if 'flowlines' in mask_spec:
+                # Riparian buffers have their own cache (see utils.flowlines)
+                from utils import flowlines
+                self.masks[name] = flowlines(mask_spec['flowlines']).buffer(mask_spec['buffer_m'], self.dem_path,
+                                                                             cache_dir=self.cache_dir)
+                return self.masks[name]
+            cache_path = self.cache_dir / 'mask_{}.npy'.format(self._mask_key(mask_spec))
+            if cache_path.exists():
+                self.masks[name] = np.load(str(cache_path))
+            else:
+                self.masks[name] = self._compute_mask(mask_spec)
+                tmp_path = str(cache_path) + '.{}.tmp'.format(os.getpid())
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, self.masks[name])
+                os.replace(tmp_path, str(cache_path))
+        return self.masks[name]
+
+    def filter_map(self, scenario):
+        """ Filter map of a scenario: 1 where cells are in any include mask and in no exclude mask """
+        scenario_spec = self.spec['scenarios'][scenario]
+        include = scenario_spec.get('include')
+        if include:
+            out = np.logical_or.reduce([self.mask(name) for name in include])
+        else:
+            out = np.ones(self.grid_header().shape, dtype=bool)
+        for name in scenario_spec.get('exclude', []):
+            out &= ~self.mask(name)
+        return out.astype(np.uint8)
+
+    def build(self, out_dir, scenarios=None):
+        """ Writes <scenario>.asc to out_dir for each scenario (all in the spec by default) and returns the paths """
+        scenarios = scenarios if scenarios is not None else list(self.spec['scenarios'])
+        header = self.grid_header()
+        Path(out_dir).mkdir(parents=True, exist_ok=True)
+        written = []
+        for scenario in scenarios:
+            outfile = Path(out_dir) / '{}.asc'.format(scenario)
+            write_grid(outfile, self.filter_map(scenario), header, fmt='%i')
+            written.append(outfile)
+        return written
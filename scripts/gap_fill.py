@@ -0,0 +1,118 @@
+# Fills NoData cells in VELMA input layers, which JPDEM/VELMA can't handle
+# Unlike utils.velma_format (ArcPy), which sets every NoData cell to 1 and so silently gives cover type 1 or age 1
+# to cells outside the source data, each layer gets one of these strategies:
+#   nearest:  value of the nearest valid cell (see nearest_fill.py)
+#   majority: most common valid value in a size x size window, repeated so that larger gaps fill from the edges in
+#   constant: a fixed value, e.g. permeability 1
+# Layers can be filled tile by tile (see grid_tiles.py) to keep memory bounded on high resolution grids, and every
+# fill reports the number of cells filled with each class
+# Script written in Python 3.7
+
+import numpy as np
+import pandas as pd
+from scipy import ndimage
+from grid_io import read_header
+from grid_tiles import iter_tiles, GridStreamWriter
+from nearest_fill import nearest_fill
+
+# ======================================================================================================================
+STRATEGIES = ('nearest', 'majority', 'constant')
+
+
+def majority_fill(arr, invalid, size=3, iterations=10):
+    """
+    Returns a copy of arr with invalid cells set to the most common valid value in the surrounding size x size window
+    Repeated up to iterations times, each pass filling from the cells filled in the pass before. Ties go to the
+    smallest value. Cells with no valid cells in reach stay invalid
+    """
+    out = np.array(arr, copy=True)
+    invalid = np.array(invalid, dtype=bool, copy=True)
+    for _ in range(iterations):
+        if not invalid.any():
+            break
+        classes = np.unique(out[~invalid])
+        best_count = np.zeros(out.shape, dtype=np.int32)
+        best_class = np.zeros(out.shape, dtype=out.dtype)
+        for value in classes:
+            count = ndimage.convolve(((out == value) & ~invalid).astype(np.int32), np.ones((size, size), np.int32),
+                                     mode='constant', cval=0)
+            better = count > best_count
+            best_count[better] = count[better]
+            best_class[better] = value
+        fill = invalid & (best_count > 0)
+        if not fill.any():
+            break
+        out[fill] = best_class[fill]
+        invalid &= ~fill
+    return out
+
+
+def fill_gaps(arr, nodata, strategy='nearest', value=None, size=3, iterations=10, metric='chessboard',
+              max_distance=None):
+    """
+    Returns (filled array, pd.Series of the number of cells filled with each value)
+    Cells that couldn't be filled (beyond max_distance or iterations) keep the NoData value
+    """
+    arr = np.asarray(arr)
+    invalid = arr == nodata
+    if strategy == 'nearest':
+        out = nearest_fill(arr, invalid, metric=metric, max_distance=max_distance)
+    elif strategy == 'majority':
+        out = majority_fill(arr, invalid, size=size, iterations=iterations)
+    elif strategy == 'constant':
+        if value is None:
+            raise ValueError('The constant strategy needs a value')
+        out = np.where(invalid, value, arr).astype(arr.dtype)
+    else:
+        raise ValueError('strategy must be one of {}, got {}'.format(STRATEGIES, strategy))
+
+    filled = out[invalid]
+    counts = pd.Series(filled[filled != nodata]).value_counts().sort_index()
+    counts.index.name = 'value'
+    counts.name = 'cells_filled'
+    return out, counts
+
+
+def fill_halo(strategy, size=3, iterations=10, max_distance=None):
+    """ Halo needed around each tile for a tiled fill to match filling the whole grid at once """
+    if strategy == 'majority':
+        return iterations * (size // 2)
+    if strategy == 'nearest':
+        return 0 if max_distance is None else int(np.ceil(max_distance))
+    return 0
+
+
+def fill_grid_file(in_path, out_path, strategy='nearest', fmt='%i', tile_rows=None, dtype=np.float64, **kwargs):
+    """
+    Fills the NoData cells of an ASCII grid and writes the result, returning the report from fill_gaps plus the
+    number of cells left unfilled. With tile_rows set, the grid is processed in bands of rows. For the nearest
+    strategy, max_distance then also sets the halo, and cells with no valid cell within max_distance stay NoData
+    """
+    header = read_header(in_path)
+    nodata = header.nodata if header.nodata is not None else -9999
+    if tile_rows is None:
+        tile_rows = header.nrows
+    elif strategy == 'nearest' and kwargs.get('max_distance') is None:
+        raise ValueError('Tiled nearest fills need a max_distance')
+    halo = fill_halo(strategy, size=kwargs.get('size', 3), iterations=kwargs.get('iterations', 10),
+                     max_distance=kwargs.get('max_distance'))
+
+    reports = []
+    unfilled = 0
+    with GridStreamWriter(out_path, header, fmt=fmt) as out:
+        for tile in iter_tiles([in_path], tile_rows=tile_rows, halo=halo, dtypes=dtype):
+            filled = fill_gaps(tile.data[0], nodata, strategy=strategy, **kwargs)[0]
+            core_in = tile.data[0][tile.core]
+            core_out = filled[tile.core]
+            out.write(core_out)
+            # Counts are taken from the core only, so halo cells aren't counted twice
+            core_filled = core_out[(core_in == nodata) & (core_out != nodata)]
+            reports.append(pd.Series(core_filled).value_counts())
+            unfilled += int((core_out == nodata).sum())
+
+    report = pd.concat(reports).groupby(level=0).sum().sort_index() if reports else pd.Series(dtype=int)
+    report.index.name = 'value'
+    report.name = 'cells_filled'
+    if unfilled:
+        print('{} cells left unfilled in {}'.format(unfilled, out_path))
+    return report, unfilled
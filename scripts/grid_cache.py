@@ -0,0 +1,111 @@
+# Binary cache in front of grid_io.read_grid
+# The first read of an ASCII grid stores its array as a .npy sidecar in the cache directory. Later reads of an
+# unchanged file (same path, size and mtime) load the sidecar directly, without parsing any text. Sidecars are keyed
+# on a hash of the file contents, so copies of the same grid share one sidecar. The least recently used sidecars are
+# removed once the cache grows past max_bytes
+# Script written in Python 3.7
+
+import hashlib
+import json
+import os
+import time
+import numpy as np
+from pathlib import Path
+from grid_io import GridHeader, read_grid
+
+# ======================================================================================================================
+
+
+def file_hash(path, chunk_size=2 ** 20):
+    """ Returns the hex digest of a file's contents """
+    h = hashlib.blake2b(digest_size=16)
+    with open(str(path), 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_json(obj, path):
+    # Write to a temp file and rename, so that an interrupted write never leaves a corrupt index
+    tmp_path = str(path) + '.{}.tmp'.format(os.getpid())
+    with open(tmp_path, 'w') as f:
+        json.dump(obj, f, indent=1)
+    os.replace(tmp_path, str(path))
+
+
+class GridCache:
+    """ Content-addressed .npy cache of ASCII grids with size-bounded LRU eviction """
+
+    def __init__(self, cache_dir, max_bytes=2 * 2 ** 30, mmap=False):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.cache_dir / 'index.json'
+        self.max_bytes = max_bytes
+        self.mmap = mmap  # If True, sidecars are returned as read-only memory maps instead of being loaded into RAM
+        self.index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(str(self.index_path), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {'files': {}, 'entries': {}}
+
+    def _content_key(self, path):
+        # Only hash the file when its size or mtime has changed since it was last seen
+        path = os.path.abspath(str(path))
+        stat = os.stat(path)
+        known = self.index['files'].get(path)
+        if known is not None and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+            return known['hash']
+        digest = file_hash(path)
+        self.index['files'][path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': digest}
+        return digest
+
+    def read_grid(self, path, dtype=np.float64):
+        """ Same as grid_io.read_grid, but served from the cache when the file hasn't changed """
+        key = '{}_{}'.format(self._content_key(path), np.dtype(dtype).str.strip('<>|='))
+        entry = self.index['entries'].get(key)
+        sidecar = self.cache_dir / '{}.npy'.format(key)
+        if entry is not None and sidecar.exists():
+            arr = np.load(str(sidecar), mmap_mode='r' if self.mmap else None)
+            header = GridHeader(**entry['header'])
+        else:
+            arr, header = read_grid(path, dtype=dtype)
+            tmp_path = self.cache_dir / '{}.{}.tmp.npy'.format(key, os.getpid())
+            np.save(str(tmp_path), arr)
+            os.replace(str(tmp_path), str(sidecar))
+            entry = {'header': header.to_dict(), 'nbytes': sidecar.stat().st_size}
+            self.index['entries'][key] = entry
+            if self.mmap:
+                arr = np.load(str(sidecar), mmap_mode='r')
+        entry['last_used'] = time.time()
+        self._evict(keep=key)
+        _write_json(self.index, self.index_path)
+        return arr, header
+
+    def _evict(self, keep=None):
+        # Remove least recently used sidecars until the cache fits in max_bytes
+        entries = self.index['entries']
+        total = sum(entry['nbytes'] for entry in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k].get('last_used', 0)):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= entries.pop(key)['nbytes']
+            try:
+                (self.cache_dir / '{}.npy'.format(key)).unlink()
+            except FileNotFoundError:
+                pass
+        live = set(entry.split('_')[0] for entry in entries)
+        self.index['files'] = {path: info for path, info in self.index['files'].items() if info['hash'] in live}
+
+    def clear(self):
+        for key in list(self.index['entries']):
+            try:
+                (self.cache_dir / '{}.npy'.format(key)).unlink()
+            except FileNotFoundError:
+                pass
+        self.index = {'files': {}, 'entries': {}}
+        _write_json(self.index, self.index_path)
@@ -0,0 +1,216 @@
+# Reading and writing of ESRI ASCII grids (.asc), the raster format used for all VELMA inputs
+# The six-line header is parsed once into a GridHeader, and the body is read in one pass with a C parser. Before
+# numpy 1.23 (requirements.txt pins 1.20) np.loadtxt parses in pure Python, so the pandas C reader is used instead.
+# Grids are written in blocks of rows, each formatted with a single string operation, to a temp file that is renamed
+# over the output once complete, so an interrupted script never leaves a truncated filter map behind.
+# read_layer loads categorical layers (stand IDs, cover type, CCAP/NLCD classes, soil texture, filter maps) in the
+# smallest integer type that holds them, with NODATA cells masked rather than converted to NaN in a float64 array
+# Script written in Python 3.7
+
+import os
+import numpy as np
+import pandas as pd
+
+# ======================================================================================================================
+# Header keys in the order they are written. xllcenter/yllcenter are also accepted when reading
+HEADER_KEYS = ['ncols', 'nrows', 'xllcorner', 'yllcorner', 'cellsize', 'NODATA_value']
+
+NUMPY_C_LOADTXT = tuple(int(x) for x in np.__version__.split('.')[:2]) >= (1, 23)
+
+# Schemas of the VELMA layers read with read_layer. 'categorical' picks the smallest integer type for the values found
+LAYER_SCHEMAS = {
+    'dem': 'float32',
+    'stand_id': 'int16',
+    'cover_type': 'categorical',
+    'cover_age': 'int16',
+    'noaa_ccap': 'uint8',
+    'nlcd': 'uint8',
+    'soil': 'int8',
+    'exp_basins': 'int8',
+    'filter_map': 'uint8',
+    'yearly_forest_loss': 'uint8',
+    'permeability': 'float32',
+}
+
+
+class GridHeader:
+    """ Typed metadata from the header of an ESRI ASCII grid """
+
+    def __init__(self, ncols, nrows, xll, yll, cellsize, nodata=-9999, center=False):
+        self.ncols = int(ncols)
+        self.nrows = int(nrows)
+        self.xll = float(xll)
+        self.yll = float(yll)
+        self.cellsize = float(cellsize)
+        self.nodata = nodata
+        self.center = center  # True if xll/yll are the center of the lower left cell (xllcenter/yllcenter)
+
+    @property
+    def shape(self):
+        return self.nrows, self.ncols
+
+    @property
+    def bounds(self):
+        """ (left, bottom, right, top) of the grid in map units """
+        left = self.xll - self.cellsize / 2 if self.center else self.xll
+        bottom = self.yll - self.cellsize / 2 if self.center else self.yll
+        return left, bottom, left + self.ncols * self.cellsize, bottom + self.nrows * self.cellsize
+
+    def to_text(self):
+        """ Header text to put at the top of an .asc file """
+        x_key, y_key = ('xllcenter', 'yllcenter') if self.center else ('xllcorner', 'yllcorner')
+        values = [self.ncols, self.nrows, _format_number(self.xll), _format_number(self.yll),
+                  _format_number(self.cellsize)]
+        lines = ['{:<14}{}\n'.format(key, value) for key, value in
+                 zip(['ncols', 'nrows', x_key, y_key, 'cellsize'], values)]
+        if self.nodata is not None:
+            lines.append('{:<14}{}\n'.format('NODATA_value', _format_number(self.nodata)))
+        return ''.join(lines)
+
+    def to_dict(self):
+        return {'ncols': self.ncols, 'nrows': self.nrows, 'xll': self.xll, 'yll': self.yll,
+                'cellsize': self.cellsize, 'nodata': self.nodata, 'center': self.center}
+
+    def __eq__(self, other):
+        if not isinstance(other, GridHeader):
+            return NotImplemented
+        return (self.shape == other.shape and self.bounds == other.bounds and self.cellsize == other.cellsize
+                and self.nodata == other.nodata)
+
+    def __repr__(self):
+        return 'GridHeader(ncols={}, nrows={}, xll={}, yll={}, cellsize={}, nodata={})'.format(
+            self.ncols, self.nrows, self.xll, self.yll, self.cellsize, self.nodata)
+
+
+def _format_number(value):
+    # Integers are written without a decimal point, as ArcGIS does
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _parse_header(f):
+    # Reads header lines from a binary file handle, leaving it positioned at the first row of data
+    fields = {}
+    while True:
+        pos = f.tell()
+        line = f.readline()
+        tokens = line.split()
+        if not tokens or not tokens[0][:1].isalpha():
+            f.seek(pos)
+            break
+        fields[tokens[0].decode().lower()] = tokens[1].decode()
+
+    try:
+        center = 'xllcenter' in fields
+        header = GridHeader(ncols=fields['ncols'], nrows=fields['nrows'],
+                            xll=fields['xllcenter' if center else 'xllcorner'],
+                            yll=fields['yllcenter' if center else 'yllcorner'],
+                            cellsize=fields['cellsize'], center=center, nodata=None)
+    except KeyError as e:
+        raise ValueError('Missing {} in ASCII grid header'.format(e))
+    if 'nodata_value' in fields:
+        nodata = float(fields['nodata_value'])
+        header.nodata = int(nodata) if nodata.is_integer() else nodata
+    return header
+
+
+def _read_body(f, dtype, nrows=None):
+    # Reads whitespace-delimited rows from the current position of a binary file handle
+    if NUMPY_C_LOADTXT:
+        return np.loadtxt(f, dtype=dtype, max_rows=nrows, ndmin=2)
+    return pd.read_csv(f, sep=r'\s+', header=None, dtype=dtype, nrows=nrows, engine='c').to_numpy()
+
+
+def read_header(path):
+    """ Returns the GridHeader of an ASCII grid without reading its data """
+    if not os.path.exists(str(path)):
+        raise FileNotFoundError('Cannot find ASCII "{}"'.format(path))
+    with open(str(path), 'rb') as f:
+        return _parse_header(f)
+
+
+def read_grid(path, dtype=np.float64):
+    """ Returns (array, GridHeader) of an ASCII grid. Drop-in for np.loadtxt(path, skiprows=6) """
+    if not os.path.exists(str(path)):
+        raise FileNotFoundError('Cannot find ASCII "{}"'.format(path))
+    with open(str(path), 'rb') as f:
+        header = _parse_header(f)
+        arr = _read_body(f, dtype)
+    if arr.shape != header.shape:
+        raise ValueError('Grid {} has shape {}, header says {}'.format(path, arr.shape, header.shape))
+    return arr, header
+
+
+def _smallest_int_type(lo, hi):
+    return np.result_type(np.min_scalar_type(int(lo)), np.min_scalar_type(int(hi)))
+
+
+def read_layer(path, schema, reader=read_grid):
+    """
+    Returns (masked array, GridHeader) of an ASCII grid in a compact dtype, with NODATA cells masked
+    schema is a key of LAYER_SCHEMAS, 'categorical', or a numpy dtype name (e.g. 'int8', 'int16', 'float32').
+    reader can be swapped for a cached reader, e.g. GridCache(...).read_grid
+    """
+    schema = LAYER_SCHEMAS.get(schema, schema)
+    integer = schema == 'categorical' or np.issubdtype(np.dtype(schema), np.integer)
+    if integer:
+        try:
+            arr, header = reader(path, dtype=np.int32)
+        except ValueError:
+            arr, header = reader(path, dtype=np.float64)
+            if not np.array_equal(arr, np.round(arr)):
+                raise ValueError('Non-integer values in {}, which has {} schema'.format(path, schema))
+    else:
+        arr, header = reader(path, dtype=np.dtype(schema))
+
+    mask = (arr == header.nodata) if header.nodata is not None else np.zeros(arr.shape, dtype=bool)
+    valid = arr[~mask]
+    if schema == 'categorical':
+        dtype = _smallest_int_type(valid.min(), valid.max()) if valid.size else np.dtype(np.uint8)
+    else:
+        dtype = np.dtype(schema)
+    if integer and valid.size:
+        info = np.iinfo(dtype)
+        if valid.min() < info.min or valid.max() > info.max:
+            raise ValueError('Values in {} are outside the range of {}'.format(path, dtype))
+
+    # Masked cells are stored as 0 so they fit in any dtype, and are written back out as NODATA by write_grid
+    data = np.where(mask, 0, arr).astype(dtype) if integer else arr.astype(dtype, copy=False)
+    return np.ma.MaskedArray(data, mask=mask), header
+
+
+def write_grid(path, arr, header, fmt=None, block_rows=512):
+    """
+    Writes an array as an ASCII grid. header is a GridHeader, or header text as returned by readHeader().
+    Masked cells of masked arrays are written as the header's NODATA value
+    """
+    if np.ma.isMaskedArray(arr):
+        nodata = -9999
+        if isinstance(header, GridHeader) and header.nodata is not None:
+            nodata = header.nodata
+        if np.issubdtype(arr.dtype, np.integer):
+            arr = arr.astype(np.result_type(arr.dtype, np.min_scalar_type(int(nodata))))
+        arr = arr.filled(nodata)
+    arr = np.asarray(arr)
+    if arr.dtype == bool:
+        arr = arr.astype(np.uint8)
+    if fmt is None:
+        fmt = '%i' if np.issubdtype(arr.dtype, np.integer) else '%f'
+    header_text = header.to_text() if isinstance(header, GridHeader) else header
+    if isinstance(header, GridHeader) and arr.shape != header.shape:
+        raise ValueError('Array has shape {}, header says {}'.format(arr.shape, header.shape))
+
+    path = str(path)
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    row_fmt = ' '.join([fmt] * arr.shape[1]) + '\n'
+    try:
+        with open(tmp_path, 'w') as f:
+            f.write(header_text)
+            for i in range(0, arr.shape[0], block_rows):
+                block = arr[i:i + block_rows]
+                f.write((row_fmt * block.shape[0]) % tuple(block.ravel().tolist()))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,211 @@
+# Windowed processing of rasters too large to hold in memory, e.g. 1m LiDAR-derived grids of the Ellsworth basin
+# iter_tiles reads the same window from several aligned layers (ASCII grids or GeoTIFFs) at once and yields them
+# block by block. Each block can be padded with a halo of neighbouring cells, so that neighbourhood operations like
+# ndimage.binary_dilation/binary_erosion give the same result as on the full grid as long as the halo is at least
+# the number of iterations. ASCII grids are streamed row by row, so only one band of rows is held in memory
+# Script written in Python 3.7
+
+import io
+import itertools
+import os
+import numpy as np
+from grid_io import GridHeader, _parse_header, _read_body
+
+# ======================================================================================================================
+
+
+class Tile:
+    """ Window of several aligned layers, padded with a halo of neighbouring cells where the grid allows """
+
+    def __init__(self, data, row_off, col_off, nrows, ncols, halo_top, halo_left, masks=None):
+        self.data = data  # List of arrays, one per layer, including the halo
+        # NODATA cells of each layer. Their values in data are NODATA if it fits the layer's dtype, and 0 otherwise
+        self.masks = masks if masks is not None else [np.zeros(d.shape, dtype=bool) for d in data]
+        self.row_off = row_off  # Position of the core window in the full grid
+        self.col_off = col_off
+        self.nrows = nrows
+        self.ncols = ncols
+        # Slices that crop the halo off of the arrays in self.data
+        self.core = (slice(halo_top, halo_top + nrows), slice(halo_left, halo_left + ncols))
+
+    @property
+    def window(self):
+        """ (row slice, col slice) of the core window in the full grid """
+        return (slice(self.row_off, self.row_off + self.nrows), slice(self.col_off, self.col_off + self.ncols))
+
+
+def _narrow(arr, dtype, nodata, path):
+    """
+    Casts a tile read in a wide type to dtype, returning (array, NODATA mask). As in grid_io.read_layer, NODATA cells
+    are stored as 0 if NODATA doesn't fit an integer dtype (e.g. -9999 in uint8), and any other value that doesn't fit
+    raises a ValueError instead of wrapping around
+    """
+    dtype = np.dtype(dtype)
+    mask = (arr == nodata) if nodata is not None else np.zeros(arr.shape, dtype=bool)
+    if not np.issubdtype(dtype, np.integer) or arr.dtype == dtype:
+        return arr.astype(dtype, copy=False), mask
+    info = np.iinfo(dtype)
+    valid = arr[~mask]
+    if valid.size:
+        if valid.min() < info.min or valid.max() > info.max:
+            raise ValueError('Values in {} are outside the range of {}'.format(path, dtype))
+        if np.issubdtype(arr.dtype, np.floating) and not np.array_equal(valid, np.round(valid)):
+            raise ValueError('Non-integer values in {}, read as {}'.format(path, dtype))
+    if mask.any() and not info.min <= nodata <= info.max:
+        arr = np.where(mask, 0, arr)
+    return arr.astype(dtype), mask
+
+
+class _AsciiSource:
+    # Streams an ASCII grid from top to bottom, keeping only the rows needed for the current band
+    def __init__(self, path, dtype):
+        self.path = path
+        self.f = open(str(path), 'rb')
+        self.header = _parse_header(self.f)
+        self.shape = self.header.shape
+        self.dtype = dtype
+        self.rows = np.empty((0, self.shape[1]), dtype=dtype)
+        self.mask = np.empty((0, self.shape[1]), dtype=bool)
+        self.first_row = 0  # Grid row of self.rows[0]
+        self.next_row = 0  # Next grid row to read from the file
+
+    def read(self, row_start, row_stop, col_start, col_stop):
+        # Rows are only ever requested in increasing order, so anything above row_start can be dropped
+        if row_stop > self.next_row:
+            lines = b''.join(itertools.islice(self.f, row_stop - self.next_row))
+            new_rows, new_mask = _narrow(self._parse(lines), self.dtype, self.header.nodata, self.path)
+            if new_rows.shape[1] != self.shape[1]:
+                raise ValueError('Row width {} does not match ncols {}'.format(new_rows.shape[1], self.shape[1]))
+            self.rows = np.concatenate([self.rows, new_rows])
+            self.mask = np.concatenate([self.mask, new_mask])
+            self.next_row = row_stop
+        self.rows = self.rows[row_start - self.first_row:]
+        self.mask = self.mask[row_start - self.first_row:]
+        self.first_row = row_start
+        window = (slice(0, row_stop - row_start), slice(col_start, col_stop))
+        return self.rows[window], self.mask[window]
+
+    def _parse(self, lines):
+        # Integer layers are parsed as int64 (float64 if the text has decimals) and narrowed after checking the values
+        if not np.issubdtype(np.dtype(self.dtype), np.integer):
+            return _read_body(io.BytesIO(lines), self.dtype)
+        try:
+            return _read_body(io.BytesIO(lines), np.int64)
+        except ValueError:
+            return _read_body(io.BytesIO(lines), np.float64)
+
+    def close(self):
+        self.f.close()
+
+
+class _RasterioSource:
+    # Windowed reads of any GDAL raster, e.g. GeoTIFF
+    def __init__(self, path, dtype):
+        import rasterio
+        self.path = path
+        from rasterio.windows import Window
+        self.Window = Window
+        self.ds = rasterio.open(str(path), 'r')
+        self.shape = (self.ds.height, self.ds.width)
+        self.dtype = dtype
+
+    def read(self, row_start, row_stop, col_start, col_stop):
+        window = self.Window(col_start, row_start, col_stop - col_start, row_stop - row_start)
+        return _narrow(self.ds.read(1, window=window), self.dtype, self.ds.nodata, self.path)
+
+    def close(self):
+        self.ds.close()
+
+
+def _open_source(path, dtype):
+    if str(path).lower().endswith('.asc'):
+        return _AsciiSource(path, dtype)
+    return _RasterioSource(path, dtype)
+
+
+def iter_tiles(paths, tile_rows=1024, tile_cols=None, halo=0, dtypes=np.float64):
+    """
+    Yields Tile objects covering aligned rasters in row-major order
+    tile_cols=None gives full-width bands of rows, which is the most efficient for ASCII grids and is required when
+    writing the results with GridStreamWriter. dtypes is one dtype for all layers or a list with one per layer.
+    Layers are checked against their dtype before narrowing: NODATA cells are flagged in Tile.masks (and stored as 0
+    when NODATA doesn't fit the dtype), and other values out of the dtype's range raise a ValueError
+    """
+    if not isinstance(dtypes, (list, tuple)):
+        dtypes = [dtypes] * len(paths)
+    sources = [_open_source(path, dtype) for path, dtype in zip(paths, dtypes)]
+    try:
+        nrows, ncols = sources[0].shape
+        for path, source in zip(paths, sources):
+            if source.shape != (nrows, ncols):
+                raise ValueError('{} has shape {}, expected {}'.format(path, source.shape, (nrows, ncols)))
+        tile_cols = ncols if tile_cols is None else tile_cols
+
+        for row_off in range(0, nrows, tile_rows):
+            row_stop = min(row_off + tile_rows, nrows)
+            row_start = max(row_off - halo, 0)
+            for col_off in range(0, ncols, tile_cols):
+                col_stop = min(col_off + tile_cols, ncols)
+                col_start = max(col_off - halo, 0)
+                reads = [source.read(row_start, min(row_stop + halo, nrows), col_start, min(col_stop + halo, ncols))
+                         for source in sources]
+                yield Tile([data for data, _ in reads], row_off, col_off, row_stop - row_off, col_stop - col_off,
+                           halo_top=row_off - row_start, halo_left=col_off - col_start,
+                           masks=[mask for _, mask in reads])
+    finally:
+        for source in sources:
+            source.close()
+
+
+class GridStreamWriter:
+    """
+    Writes an ASCII grid one band of rows at a time, e.g. the core of each Tile from iter_tiles
+    The file is written to a temp path and renamed over the output once all rows have been written. Used as a context
+    manager, the temp file is removed if an exception is raised before then
+    """
+
+    def __init__(self, path, header, fmt='%i'):
+        if not isinstance(header, GridHeader):
+            raise TypeError('header must be a GridHeader')
+        self.path = str(path)
+        self.tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+        self.header = header
+        self.fmt = fmt
+        self.rows_written = 0
+        self.f = open(self.tmp_path, 'w')
+        self.f.write(header.to_text())
+
+    def write(self, rows):
+        """ Writes a band of rows. Masked cells of masked arrays are written as the header's NODATA value """
+        if np.ma.isMaskedArray(rows):
+            nodata = self.header.nodata if self.header.nodata is not None else -9999
+            if np.issubdtype(rows.dtype, np.integer):
+                rows = rows.astype(np.result_type(rows.dtype, np.min_scalar_type(int(nodata))))
+            rows = rows.filled(nodata)
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = rows.astype(np.uint8)
+        if rows.ndim != 2 or rows.shape[1] != self.header.ncols:
+            raise ValueError('Rows must have shape (n, {}), got {}'.format(self.header.ncols, rows.shape))
+        row_fmt = ' '.join([self.fmt] * rows.shape[1]) + '\n'
+        self.f.write((row_fmt * rows.shape[0]) % tuple(rows.ravel().tolist()))
+        self.rows_written += rows.shape[0]
+
+    def close(self):
+        self.f.close()
+        if self.rows_written != self.header.nrows:
+            os.remove(self.tmp_path)
+            raise ValueError('Wrote {} rows to {}, header says {}'.format(self.rows_written, self.path,
+                                                                         self.header.nrows))
+        os.replace(self.tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Leave no partial output behind if processing failed
+            self.f.close()
+            os.remove(self.tmp_path)
@@ -0,0 +1,84 @@
+# Random clearcut schedules and harvest-year rasters
+# A schedule is a table of (year, VELMA_ID) rows, one per stand harvest. Schedules are drawn with the
+# stand_engine.StandAgeEngine from a seeded numpy Generator, so every schedule can be reproduced from its seed, and
+# are mapped onto the grid with a stand_index.StandIndex instead of rasterizing polygons. ensemble() draws many
+# schedules in a process pool
+# Script written in Python 3.7
+
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from stand_engine import StandAgeEngine, AgeThreshold, RandomFraction
+
+# ======================================================================================================================
+
+
+def random_clearcut_schedule(stand_ids, ages, rng, start_date, end_date, yearly_cut=0.1, clearcut_age=35,
+                             rules=()):
+    """
+    Randomly samples up to yearly_cut of all stands from those at least clearcut_age old each year, until no stands are
+    eligible or end_date is reached. Harvested stands go back to age 0. rng is a numpy Generator or a seed.
+    rules are extra eligibility rules for the stand_engine.StandAgeEngine, e.g.
+    GreenUp.from_stand_index(stand_index, stand_ids), which aligns the stand adjacency to the order of stand_ids
+    Returns a DataFrame with columns year and VELMA_ID
+    """
+    stand_ids = np.asarray(stand_ids)
+    engine = StandAgeEngine(ages, [AgeThreshold(clearcut_age)] + list(rules), RandomFraction(yearly_cut), rng=rng)
+    harvests = engine.run(start_date, end_date, stop_when_none_eligible=True)
+    return pd.DataFrame({'year': harvests['year'].values, 'VELMA_ID': stand_ids[harvests['stand'].values]})
+
+
+def harvest_year_grid(stand_index, schedule, protected=None, dtype=np.int16):
+    """ Grid of the first harvest year of each cell (0 = never harvested). Protected cells are never harvested """
+    out = np.zeros(stand_index.shape, dtype=dtype)
+    # Later years are written first, so the first harvest of stands cut more than once wins
+    for year, stands in sorted(schedule.groupby('year')['VELMA_ID'], key=lambda x: x[0], reverse=True):
+        out.flat[stand_index.stand_cells(stands.values)] = year
+    if protected is not None:
+        out[protected] = 0
+    return out
+
+
+def harvested_cells(stand_index, schedule, protected=None):
+    """ Number of unprotected cells harvested each year, as a Series indexed by year """
+    stand_cells = pd.Series(stand_index.stand_areas(exclude=protected), index=stand_index.ids)
+    return schedule['VELMA_ID'].map(stand_cells).fillna(0).astype(int).groupby(schedule['year']).sum()
+
+
+# =======================================================================
+# Ensembles
+
+_worker = {}
+
+
+def _init_worker(stand_index, protected, stand_ids, ages, kwargs):
+    # Shared inputs are sent to each worker process once, rather than with every realization
+    _worker.update(stand_index=stand_index, protected=protected, stand_ids=stand_ids, ages=ages, kwargs=kwargs)
+
+
+def _realization(task):
+    i, seed = task
+    schedule = random_clearcut_schedule(_worker['stand_ids'], _worker['ages'], np.random.default_rng(seed),
+                                        **_worker['kwargs'])
+    grid = harvest_year_grid(_worker['stand_index'], schedule, _worker['protected'])
+    cells = harvested_cells(_worker['stand_index'], schedule, _worker['protected'])
+    return i, schedule, grid, cells
+
+
+def ensemble(stand_index, stand_ids, ages, n, seed, protected=None, processes=None, **kwargs):
+    """
+    Draws n seeded random_clearcut_schedules in a process pool. Realization i uses the i-th child of
+    np.random.SeedSequence(seed), so any realization can be redrawn on its own
+    Returns (int16 stack of harvest-year grids of shape (n, nrows, ncols), DataFrame of all schedules,
+    DataFrame of cells harvested per realization and year). Calling scripts must use `if __name__ == '__main__':`
+    """
+    seeds = np.random.SeedSequence(seed).spawn(n)
+    stack = np.zeros((n,) + stand_index.shape, dtype=np.int16)
+    schedules, areas = [], []
+    init_args = (stand_index, protected, stand_ids, ages, kwargs)
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=init_args) as pool:
+        for i, schedule, grid, cells in pool.map(_realization, enumerate(seeds)):
+            stack[i] = grid
+            schedules.append(schedule.assign(realization=i))
+            areas.append(pd.DataFrame({'realization': i, 'year': cells.index, 'cells': cells.values}))
+    return stack, pd.concat(schedules, ignore_index=True), pd.concat(areas, ignore_index=True)
@@ -0,0 +1,121 @@
+# Clearcut scheduling under spatial forest-practice constraints, as an alternative to random stand sampling
+# Each year, stands old enough to cut are taken from a priority queue (oldest first, or random) and harvested if:
+#   - the year's harvested area stays within max_area_per_year
+#   - the opening the stand would form, i.e. the stand plus all connected stands cut within the last green_up years,
+#     stays within max_opening. With max_opening=None, stands next to any recent cut are skipped (strict adjacency)
+# Stands are adjacent if they share at least min_boundary metres of boundary, from StandIndex.boundary_lengths().
+# Openings are tracked with a union-find over the recently cut stands, so checking a stand only looks at its neighbours
+# Script written in Python 3.7
+
+import heapq
+import numpy as np
+import pandas as pd
+from scipy.sparse import csgraph
+
+# ======================================================================================================================
+
+
+class _Openings:
+    """ Union-find of connected recently cut stands, with the total area of each opening """
+
+    def __init__(self, open_stands, adjacency, areas):
+        self.parent = {}
+        self.area = {}
+        if len(open_stands):
+            n_components, labels = csgraph.connected_components(adjacency[open_stands][:, open_stands],
+                                                                directed=False)
+            component_area = np.bincount(labels, weights=areas[open_stands], minlength=n_components)
+            # The first stand of each component is its root
+            roots = {}
+            for stand, label in zip(open_stands, labels):
+                root = roots.setdefault(label, stand)
+                self.parent[stand] = root
+            for label, root in roots.items():
+                self.area[root] = component_area[label]
+
+    def find(self, stand):
+        root = stand
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[stand] != root:
+            self.parent[stand], stand = root, self.parent[stand]
+        return root
+
+    def neighbour_roots(self, neighbours):
+        return {self.find(n) for n in neighbours if n in self.parent}
+
+    def add(self, stand, area, roots):
+        self.parent[stand] = stand
+        self.area[stand] = area + sum(self.area.pop(root) for root in roots)
+        for root in roots:
+            self.parent[root] = stand
+
+
+class HarvestScheduler:
+    """ Yearly clearcut schedule of the stands of a StandIndex under age, area, opening size and green-up rules """
+
+    def __init__(self, stand_index, ages, cellsize, protected=None, clearcut_age=35, green_up=5,
+                 max_opening=48.6, max_area_per_year=None, min_boundary=0.0, priority='oldest', rng=None):
+        """
+        ages are given in the order of stand_index.ids. Areas are in hectares (the default max_opening is the 120
+        acre WA limit), protected cells don't count towards harvested area. priority is 'oldest' or 'random'
+        """
+        self.ids = stand_index.ids
+        self.ages = np.array(ages, dtype=np.int64, copy=True)
+        self.areas = stand_index.stand_areas(exclude=protected) * cellsize ** 2 / 1e4
+        boundaries = stand_index.boundary_lengths(cellsize)
+        self.adjacency = (boundaries > min_boundary).tocsr()
+        self.clearcut_age = clearcut_age
+        self.green_up = green_up
+        self.max_opening = max_opening
+        self.max_area_per_year = max_area_per_year
+        self.priority = priority
+        self.rng = np.random.default_rng(rng)
+        self.last_harvest = np.full(len(self.ids), np.iinfo(np.int32).min, dtype=np.int64)
+
+    def _neighbours(self, stand):
+        return self.adjacency.indices[self.adjacency.indptr[stand]:self.adjacency.indptr[stand + 1]]
+
+    def step(self, year):
+        """ Harvests one year, returning the positions (in stand_index.ids order) of the stands cut """
+        open_stands = np.flatnonzero(year - self.last_harvest < self.green_up)
+        openings = _Openings(open_stands, self.adjacency, self.areas)
+
+        candidates = np.flatnonzero((self.ages >= self.clearcut_age) & (self.areas > 0))
+        if self.priority == 'random':
+            keys = self.rng.random(len(candidates))
+        else:
+            keys = -self.ages[candidates] + self.rng.random(len(candidates)) * 0.5  # Random tie-break within an age
+        queue = list(zip(keys, candidates))
+        heapq.heapify(queue)
+
+        cut = []
+        year_area = 0.0
+        while queue:
+            _, stand = heapq.heappop(queue)
+            area = self.areas[stand]
+            if self.max_area_per_year is not None and year_area + area > self.max_area_per_year:
+                continue
+            roots = openings.neighbour_roots(self._neighbours(stand))
+            if self.max_opening is None:
+                if roots:
+                    continue
+            elif area + sum(openings.area[root] for root in roots) > self.max_opening:
+                continue
+            openings.add(stand, area, roots)
+            cut.append(stand)
+            year_area += area
+
+        cut = np.array(cut, dtype=np.intp)
+        self.ages += 1
+        self.ages[cut] = 0
+        self.last_harvest[cut] = year
+        return cut
+
+    def run(self, start, end):
+        """ Schedules the years start to end - 1. Returns a DataFrame with columns year, VELMA_ID and area_ha """
+        rows = []
+        for year in range(start, end):
+            cut = self.step(year)
+            rows.append(pd.DataFrame({'year': year, 'VELMA_ID': self.ids[cut], 'area_ha': self.areas[cut]}))
+        return pd.concat(rows, ignore_index=True)
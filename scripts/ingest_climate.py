@@ -0,0 +1,31 @@
+# Ingests the VIC-WRF flux and forcing files of every model/run, and the PRISM and gauge daily records, into the
+# columnar climate store (see climate_store.py). Only files changed since they were last ingested are read again.
+# Run before export_GCM.py, export_VICWRF_avgs.py and export_PRISM.py
+# Script written in Python 3.7
+
+import __init__
+import scripts.config as config
+from climate_store import ClimateStore, vicwrf_text_files, ingest_text_files
+
+# =======================================================================
+# Config
+
+wrf_dir = config.data_path / 'precip' / 'VIC_WRF_EllsworthCr'
+forc_dir = config.data_path / 'precip' / 'WRF_frcs_EllsworthCr_forcings'
+gauge_csv = config.daily_ppt.parents[0] / 'GHCND_USC00455774_1929_2020.csv'
+processes = None  # Worker processes, None for one per core
+overwrite = False  # Re-ingest files even if they haven't changed
+
+# =======================================================================
+
+if __name__ == '__main__':
+    store = ClimateStore(config.climate_store)
+
+    ingested = ingest_text_files(store, vicwrf_text_files(wrf_dir, forc_dir), processes=processes, overwrite=overwrite)
+    for key in ingested:
+        print('Ingested {}/{}/{}'.format(*key))
+
+    # Observed daily records
+    store.ingest_csv('observed', 'prism', 'ppt', config.daily_ppt, overwrite=overwrite, index_col=0)
+    store.ingest_csv('observed', 'prism', 'temp', config.daily_temp_mean, overwrite=overwrite, index_col=0)
+    store.ingest_csv('observed', 'ghcnd', 'USC00455774', gauge_csv, overwrite=overwrite, index_col=5)
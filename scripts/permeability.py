@@ -0,0 +1,63 @@
+# Builds cover permeability maps from the CCAP and NLCD layers, for one or a sweep of road permeabilities and erosions
+# Roads are NLCD developed open space and low intensity, eroded by road_erosion cells (they look to be about 10-20m,
+# not 30m), plus CCAP developed and dirt. Road cells take perm_fraction and all other cells 1.
+# The road and developed masks are computed once per band of rows, and every map of a sweep is written in the same
+# pass over the inputs, as float32 grids with a manifest of the parameters of each file
+# Script written in Python 3.7
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from scipy import ndimage
+from contextlib import ExitStack
+from grid_io import read_header
+from grid_tiles import iter_tiles, GridStreamWriter
+from reclassify import load_classes
+
+# ======================================================================================================================
+
+
+def road_masks(ccap, nlcd, road_erosions, ccap_classes, nlcd_classes):
+    """
+    Dict of {road_erosion: boolean road grid} for raw (uint8) CCAP and NLCD grids, given their class tables. NODATA
+    cells, which iter_tiles reads as 0, are never roads, as when the layers were read as floats and offset by 100
+    """
+    nlcd_roads = nlcd_classes.is_class(nlcd, ['dev_openspace', 'dev_low'])
+    developed = ccap_classes.is_class(ccap, ['developed', 'dirt'])
+    masks = {}
+    for erosion in road_erosions:
+        # binary_erosion with iterations=0 erodes until nothing changes, so 0 is no erosion
+        roads = ndimage.binary_erosion(nlcd_roads, iterations=erosion) if erosion > 0 else nlcd_roads
+        masks[erosion] = roads | developed
+    return masks
+
+
+def sweep_outputs(out_dir, perm_fractions, road_erosions):
+    """ List of (path, perm_fraction, road_erosion) for every combination of the swept values """
+    return [(Path(out_dir) / 'permeability_p{:g}_e{}.asc'.format(fraction, erosion), fraction, erosion)
+            for erosion in road_erosions for fraction in perm_fractions]
+
+
+def build_permeability(ccap_path, nlcd_path, outputs, tile_rows=1024):
+    """
+    Writes a permeability map for each (path, perm_fraction, road_erosion) in outputs, in one pass over the inputs.
+    Returns a manifest DataFrame with the file, parameters and road cell count of each map
+    """
+    erosions = sorted({int(erosion) for _, _, erosion in outputs})
+    halo = max(erosions)  # Gives the same road erosion as eroding the full grid
+    header = read_header(nlcd_path)
+    road_cells = {erosion: 0 for erosion in erosions}
+    classes = load_classes('ccap'), load_classes('nlcd')
+    with ExitStack() as stack:
+        writers = [stack.enter_context(GridStreamWriter(path, header, fmt='%g')) for path, _, _ in outputs]
+        for tile in iter_tiles([ccap_path, nlcd_path], tile_rows=tile_rows, halo=halo, dtypes=np.uint8):
+            masks = {erosion: roads[tile.core] for erosion, roads in road_masks(*tile.data, erosions, *classes).items()}
+            for erosion, roads in masks.items():
+                road_cells[erosion] += int(roads.sum())
+            for writer, (_, fraction, erosion) in zip(writers, outputs):
+                writer.write(np.where(masks[int(erosion)], np.float32(fraction), np.float32(1)))
+
+    return pd.DataFrame({'file': [Path(path).name for path, _, _ in outputs],
+                         'perm_fraction': [fraction for _, fraction, _ in outputs],
+                         'road_erosion': [int(erosion) for _, _, erosion in outputs],
+                         'road_cells': [road_cells[int(erosion)] for _, _, erosion in outputs]})
@@ -0,0 +1,157 @@
+# Persistent catalog of the rasters in a data directory (e.g. config.velma_data)
+# Each raster is read once to record its header, CRS, extent, dtype, min/max, NoData count and content hash in a JSON
+# index. Later scans only re-read files whose size or mtime changed, so format checks, extent-alignment checks and
+# "has this input changed since the last VELMA run" queries don't need to load any grids
+# Script written in Python 3.7
+
+import json
+import os
+import time
+import numpy as np
+from pathlib import Path
+from grid_io import read_grid
+from grid_cache import file_hash, _write_json
+
+# ======================================================================================================================
+RASTER_EXTENSIONS = ('.asc', '.tif', '.tiff')
+
+
+def _describe_ascii(path):
+    arr, header = read_grid(path)
+    crs = None
+    prj = Path(path).with_suffix('.prj')
+    if prj.exists():
+        crs = prj.read_text().strip()
+    return arr, header.nodata, crs, header.bounds, header.cellsize
+
+
+def _describe_rasterio(path):
+    import rasterio
+    with rasterio.open(str(path), 'r') as src:
+        arr = src.read(1)
+        crs = src.crs.to_wkt() if src.crs else None
+        return arr, src.nodata, crs, tuple(src.bounds), src.res[0]
+
+
+def describe_raster(path):
+    """ Returns the catalog entry of a single raster """
+    if str(path).lower().endswith('.asc'):
+        arr, nodata, crs, bounds, cellsize = _describe_ascii(path)
+    else:
+        arr, nodata, crs, bounds, cellsize = _describe_rasterio(path)
+
+    nodata_mask = (arr == nodata) if nodata is not None else np.zeros(arr.shape, dtype=bool)
+    if np.issubdtype(arr.dtype, np.floating):
+        nodata_mask |= np.isnan(arr)
+    valid = arr[~nodata_mask]
+    if valid.size == 0:
+        vmin = vmax = None
+        dtype = str(arr.dtype)
+    else:
+        vmin, vmax = valid.min().item(), valid.max().item()
+        # Smallest dtype that holds the values, e.g. for choosing a grid_io.read_layer schema
+        if np.array_equal(valid, np.round(valid)):
+            dtype = str(np.result_type(np.min_scalar_type(int(vmin)), np.min_scalar_type(int(vmax))))
+        else:
+            dtype = 'float32' if np.array_equal(valid, valid.astype(np.float32)) else 'float64'
+
+    stat = os.stat(str(path))
+    return {'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'hash': file_hash(path),
+            'shape': list(arr.shape),
+            'cellsize': float(cellsize),
+            'bounds': [float(x) for x in bounds],
+            'crs': crs,
+            'nodata': nodata,
+            'nodata_count': int(nodata_mask.sum()),
+            'dtype': dtype,
+            'min': vmin,
+            'max': vmax}
+
+
+class RasterCatalog:
+    """ On-disk index of raster headers and statistics, updated incrementally """
+
+    def __init__(self, root, index_path=None):
+        self.root = Path(root)
+        self.index_path = Path(index_path) if index_path is not None else self.root / '.raster_catalog.json'
+        try:
+            with open(str(self.index_path), 'r') as f:
+                self.index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.index = {'rasters': {}, 'runs': {}}
+
+    def _key(self, path):
+        # Entries are keyed on the path relative to the root, so the catalog moves with the data directory
+        path = Path(path)
+        if path.is_absolute() or self.root in path.parents:
+            path = Path(os.path.relpath(str(path.absolute()), str(self.root.absolute())))
+        return path.as_posix()
+
+    def scan(self, verbose=True):
+        """ Updates entries of new and changed rasters, and drops entries of deleted ones """
+        rasters = self.index['rasters']
+        seen = set()
+        updated = []
+        for dirpath, dirnames, filenames in os.walk(str(self.root)):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]  # Skip hidden dirs, e.g. the grid cache
+            for filename in filenames:
+                if not filename.lower().endswith(RASTER_EXTENSIONS):
+                    continue
+                path = Path(dirpath) / filename
+                key = self._key(path)
+                seen.add(key)
+                stat = os.stat(str(path))
+                entry = rasters.get(key)
+                if entry is not None and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                    continue
+                rasters[key] = describe_raster(path)
+                updated.append(key)
+                if verbose:
+                    print('Cataloged', key)
+        for key in set(rasters) - seen:
+            del rasters[key]
+        self.index['scanned_at'] = time.time()
+        self.save()
+        return updated
+
+    def save(self):
+        _write_json(self.index, self.index_path)
+
+    def get(self, path):
+        """ Returns the catalog entry of a raster, cataloging it first if needed """
+        key = self._key(path)
+        entry = self.index['rasters'].get(key)
+        if entry is None:
+            entry = describe_raster(self.root / key)
+            self.index['rasters'][key] = entry
+            self.save()
+        return entry
+
+    def check_alignment(self, reference, paths=None):
+        """ Returns a list of messages for rasters whose shape, extent or cell size differ from the reference """
+        ref = self.get(reference)
+        paths = paths if paths is not None else list(self.index['rasters'])
+        messages = []
+        for path in paths:
+            entry = self.get(path)
+            if entry['shape'] != ref['shape']:
+                messages.append('Shape mismatch: {} in {}'.format(tuple(entry['shape']), path))
+            if not np.allclose(entry['bounds'], ref['bounds']) or entry['cellsize'] != ref['cellsize']:
+                messages.append('Extent mismatch: {} (cell size {}) in {}'.format(entry['bounds'], entry['cellsize'],
+                                                                                  path))
+        return messages
+
+    def mark_run(self, name, paths=None):
+        """ Records the content hashes of the inputs used by a VELMA run """
+        paths = paths if paths is not None else list(self.index['rasters'])
+        self.index['runs'][name] = {'time': time.time(),
+                                    'hashes': {self._key(path): self.get(path)['hash'] for path in paths}}
+        self.save()
+
+    def changed_since_run(self, name):
+        """ Returns the inputs of a recorded run that have changed or been deleted since. Call scan() first """
+        run = self.index['runs'][name]
+        return [key for key, digest in run['hashes'].items()
+                if key not in self.index['rasters'] or self.index['rasters'][key]['hash'] != digest]
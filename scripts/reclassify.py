@@ -0,0 +1,94 @@
+# Class tables and lookup-table (LUT) reclassification of categorical land cover layers
+# Class tables map the raw values of a layer to the ids and names used in the merged cover maps, and are read from
+# CSV (or YAML if PyYAML is installed) with columns type, id and optionally value (the raw value, default id):
+#   ccap_classes.csv, nlcd_classes.csv: CCAP and NLCD classes, with ids offset by 100 so they don't clash with stands
+#   cover_type_key.csv: stand cover types, written by cover_edit_stands.py
+# A reclassification is one LUT index of the raw layer (lut[raw]), followed by overlay rules applied in order, each
+# setting the cells where another layer is in given classes to a fixed id. Raw values that aren't in the class table
+# have no id, so reclassify raises a ValueError naming them rather than passing them through
+# Script written in Python 3.7
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# ======================================================================================================================
+CLASS_DIR = Path(__file__).parent
+
+
+class ClassTable:
+    """ Raw values, ids and names of the classes of a categorical layer """
+
+    def __init__(self, table):
+        table = table.copy()
+        if 'value' not in table:
+            table['value'] = table['id']
+        self.table = table.astype({'value': int, 'id': int})
+        self.ids = dict(zip(self.table['type'], self.table['id']))
+        self.values = dict(zip(self.table['type'], self.table['value']))
+
+    @classmethod
+    def read(cls, path):
+        path = Path(path)
+        if path.suffix.lower() in ('.yaml', '.yml'):
+            import yaml
+            with open(str(path), 'r') as f:
+                return cls(pd.DataFrame(yaml.safe_load(f)))
+        return cls(pd.read_csv(str(path)))
+
+    def id(self, name):
+        """ Id of a class in the merged cover maps """
+        return self.ids[name]
+
+    def value(self, name):
+        """ Raw value of a class in the layer """
+        return self.values[name]
+
+    def lut(self, mapping=None, size=256, dtype=np.uint8):
+        """
+        Lookup table from raw values to ids, with the classes named in mapping ({name: id}) sent to other ids
+        Entries of raw values that aren't in the table are meaningless: pass the table to reclassify to reject them
+        """
+        lut = np.arange(size).astype(dtype)
+        lut[self.table['value'].values] = self.table['id'].values
+        for name, new_id in (mapping or {}).items():
+            lut[self.values[name]] = new_id
+        return lut
+
+    def is_class(self, raw, names):
+        """ Boolean grid of the cells of a raw layer in any of the named classes """
+        member = np.zeros(256, dtype=bool)
+        member[[self.values[name] for name in names]] = True
+        return member[raw]
+
+    def check(self, raw):
+        """ Raises a ValueError naming the values of a raw layer that aren't in the table """
+        known = np.zeros(max(256, int(self.table['value'].max()) + 1), dtype=bool)
+        known[self.table['value'].values] = True
+        unknown = ~known[raw]
+        if unknown.any():
+            raise ValueError('Raw values not in the class table: {}'.format(np.unique(raw[unknown]).tolist()))
+
+
+def load_classes(name):
+    """ Class table shipped with the scripts, e.g. load_classes('ccap') reads ccap_classes.csv """
+    return ClassTable.read(CLASS_DIR / '{}_classes.csv'.format(name))
+
+
+def read_cover_key(path):
+    """ Stand cover type key (cover_type_key.csv) as a ClassTable """
+    return ClassTable.read(path)
+
+
+def reclassify(raw, lut, overlays=(), classes=None):
+    """
+    Returns lut[raw], then for each (mask, id) in overlays, in order, sets the cells where mask is True to id
+    raw must hold integers in the range of the LUT, e.g. a uint8 layer read with grid_io.read_layer
+    classes is the ClassTable the LUT was built from. If given, raw values that aren't in it raise a ValueError
+    """
+    if classes is not None:
+        classes.check(raw)
+    out = lut[raw]
+    for mask, new_id in overlays:
+        out[mask] = new_id
+    return out
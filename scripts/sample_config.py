@@ -48,3 +48,9 @@ exp_basins_velma = velma_data / 'landcover' / 'experimental_basins_2010.asc'
 soil_velma = velma_data / 'soil' / 'MapunitRaster_10m.asc'
 noaa_ccap_velma = velma_data / 'landcover' / 'noaa_ccap.asc'
 yearly_forest_loss_velma = velma_data / 'landcover' / 'yearly_forest_loss.asc'
+
+# Binary cache of ASCII grids read by the Python 3.x scripts (see grid_cache.py)
+grid_cache_dir = velma_data / '.grid_cache'
+
+# Columnar store of the climate forcing data, ingested from the text files by ingest_climate.py (see climate_store.py)
+climate_store = data_path / 'precip' / 'climate_store'
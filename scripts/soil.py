@@ -182,7 +182,6 @@ arcpy.RasterToASCII_conversion(in_raster=statsgo2_tmp, out_ascii_file=statsgo2_t
 # Merge gSSURGO and STATSGO2 together
 mergeSoils(gssurgo_temp, statsgo2_temp, str(config.soil_velma))
 
-arcpy.Delete_management(str(config.soil_velma.parents[0] / '{}_mergedFile.asc'.format(config.soil_velma.stem)))
 arcpy.Delete_management(gssurgo_temp)
 arcpy.Delete_management(statsgo2_temp)
 
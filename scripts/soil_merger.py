@@ -14,10 +14,17 @@
 # be assigned a nearest neighbor value from a circling radial stepping
 # algorithm. The stepping algorithm steps one cell radius per iteration until
 # it finds a soil texture cell value.  The algorithm ignores border cells.
+# mergeSoils does this for all cells at once with nearest_fill.nearest_fill,
+# which matches lookAround cell for cell.
+#
+# The gSSURGO/STATSGO2 merge is vectorized with NumPy, and the intermediate merged file is only written if
+# requested. Runs under Python 3.
 #
 # Last updated: 11-16-2017
 
 import os, sys, numpy, re, argparse, itertools
+from grid_io import read_grid, write_grid
+from nearest_fill import nearest_fill
 
 
 # ------------------------------------------------------------------------------------------------
@@ -49,6 +56,9 @@ def main(argv=None):
                             default='D:/GIS/Nisqually/Soil/build_old_timey_mudButt_6.asc',
                             help='Fully-qualified path + name of ".asc" output file.')
 
+        parser.add_argument('-MERGED', action='store_true', dest='writeMergeFile',
+                            help='Also write the merged map before NODATA fixes, as "<OUT>_mergedFile.asc".')
+
         args = parser.parse_args()
 
         # args parsing
@@ -64,7 +74,7 @@ def main(argv=None):
             raise Usage('Cannot find AOI file "' + statsgoAsc + '"')
 
         # do the work
-        mergeSoils(ssurgoAsc, statsgoAsc, buildFile)
+        mergeSoils(ssurgoAsc, statsgoAsc, buildFile, args.writeMergeFile)
 
     except Usage as e:
         print(e.msg)
@@ -116,8 +126,8 @@ def lookAround(passRow, passCol, inArray):
         # Create search box of one cell distance
         if radius == 1:
 
-            for i in xrange(radius):
-                for j in xrange(radius):
+            for i in range(radius):
+                for j in range(radius):
                     rowList.append((i + 1) * -1)
                     rowList.append(i + 1)
                     colList.append((i + 1) * -1)
@@ -134,8 +144,8 @@ def lookAround(passRow, passCol, inArray):
 
             # Create an inner one radius cell shorter search box
             # Keeps track of already searched cells in radius
-            for i in xrange((radius - 1)):
-                for j in xrange((radius - 1)):
+            for i in range((radius - 1)):
+                for j in range((radius - 1)):
                     rowList.append((i + 1) * -1)
                     rowList.append(i + 1)
                     colList.append((i + 1) * -1)
@@ -147,8 +157,8 @@ def lookAround(passRow, passCol, inArray):
             colList = [0]
 
             # Create an full radius cell search box around the missing value cell
-            for i in xrange(radius):
-                for j in xrange(radius):
+            for i in range(radius):
+                for j in range(radius):
                     rowList.append((i + 1) * -1)
                     rowList.append(i + 1)
                     colList.append((i + 1) * -1)
@@ -177,78 +187,42 @@ def lookAround(passRow, passCol, inArray):
 
 # ------------------------------------------------------------------------------------------------
 # Merge SSUGO STATSGO Soils, then replace nodata values
-def mergeSoils(ssurgoAsc, statsgoAsc, buildFile):
+def mergeSoils(ssurgoAsc, statsgoAsc, buildFile, writeMergeFile=False):
     # Load ssrgo array file
-    ssgoArray = numpy.loadtxt(ssurgoAsc, skiprows=6)
+    ssgoArray = read_grid(ssurgoAsc)[0]
     # Load statsgo array file
-    statsArray = numpy.loadtxt(statsgoAsc, skiprows=6)
+    statsArray = read_grid(statsgoAsc)[0]
 
     row, col = ssgoArray.shape
-    # Create new merge array
-    mergeArray = numpy.zeros((row, col))
 
     print("Starting texture map merge.")
 
-    for i in xrange(row):
-        for j in xrange(col):
-            # Get soil values
-            ssgoValue = ssgoArray[i, j]
-            statsValue = statsArray[i, j]
-
-            # Assign higher resolution ssurgo values first
-            if ssgoValue != -9999:
-                mergeArray[i, j] = ssgoValue
-            # Assign lower resolution statsgo next
-            elif statsValue != -9999:
-                mergeArray[i, j] = statsValue
-            # Assign no data value if neither has a set has a value
-            else:
-                mergeArray[i, j] = -9999
-
-    # Merged ssurgo statsgo, export complete ascii
-
-    fileName, fileExtension = os.path.splitext(buildFile)
-
-    mergeFile = fileName + "_mergedFile" + fileExtension
+    # Assign higher resolution ssurgo values first, then lower resolution statsgo. Cells with neither stay -9999.
+    # Values are truncated to integers, as they were when the merged map was written out and reloaded
+    mergeArray = numpy.trunc(numpy.where(ssgoArray != -9999, ssgoArray, statsArray))
 
     header = readHeader(ssurgoAsc)
 
-    f = open(mergeFile, "w")
-    f.write(header)
-    numpy.savetxt(f, mergeArray, fmt="%i")
-    f.close()
+    # Merged ssurgo statsgo, export complete ascii if requested
+    if writeMergeFile:
+        fileName, fileExtension = os.path.splitext(buildFile)
 
-    print("Created intermediate merged gSSURGO and STATSGO2 file: ", mergeFile)
+        mergeFile = fileName + "_mergedFile" + fileExtension
 
-    reloadArray = numpy.loadtxt(mergeFile, skiprows=6)
+        write_grid(mergeFile, mergeArray, header, fmt="%i")
 
-    noDataArray = numpy.zeros((row, col))
+        print("Created intermediate merged gSSURGO and STATSGO2 file: ", mergeFile)
 
     print("Starting NODATA fixes.")
 
-    # Replace nodata cells with search radius algorythm
-    for i in xrange(row):
-        for j in xrange(col):
-            mergeValue = reloadArray[i, j]
-
-            # if nodata, send to search algorythm
-            if mergeValue == -9999:
-                newValue = lookAround(i, j, reloadArray)
-
-                noDataArray[i, j] = newValue
-            # else keep merged data value
-            else:
-                noDataArray[i, j] = mergeValue
+    # Replace nodata cells with the nearest merged value. Gives the same result as calling lookAround on every nodata
+    # cell, using a distance transform instead of a radial search per cell
+    noDataArray = nearest_fill(mergeArray, -9999)
 
     # Merged ssurgo statsgo and nodata filled, export complete ascii
-    header = readHeader(ssurgoAsc)
-
     outputFile = buildFile
 
-    f = open(outputFile, "w")
-    f.write(header)
-    numpy.savetxt(f, noDataArray, fmt="%i")
-    f.close()
+    write_grid(outputFile, noDataArray, header, fmt="%i")
 
     print("Completed texture file!")
 
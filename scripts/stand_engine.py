@@ -0,0 +1,143 @@
+# Stand-level forest age simulation over plain arrays
+# Ages of every stand in every realization are held in one (n_realizations, n_stands) array and stepped a year at a
+# time with whole-array operations, so long projections (e.g. 1000 years) or many realizations of a scenario cost a
+# few milliseconds per year rather than a GeoDataFrame copy per stand subset.
+# Harvests are decided by pluggable rules:
+#   eligibility rules: callables (engine, year) -> boolean (n_realizations, n_stands) array. All must be True
+#   a selection rule:  callable (engine, eligible, year) -> boolean array of the stands harvested that year
+# Harvested stands go back to age 0. Custom rules only need to follow the same call signatures
+# Script written in Python 3.7
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# ======================================================================================================================
+# Eligibility rules
+
+
+class AgeThreshold:
+    """ Stands at least min_age years old """
+
+    def __init__(self, min_age):
+        self.min_age = min_age
+
+    def __call__(self, engine, year):
+        return engine.ages >= self.min_age
+
+
+class GreenUp:
+    """
+    Stands not adjacent to a stand harvested in the last green_up years
+    Only harvests of earlier years are considered, so two neighbouring stands can still be selected in the same year
+    """
+
+    def __init__(self, adjacency, adjacency_ids, stand_ids, green_up=5):
+        """
+        adjacency has rows and columns in the order of adjacency_ids, e.g. StandIndex.adjacency() and StandIndex.ids.
+        It is reindexed to stand_ids, the order of the engine's ages. Stands missing from adjacency_ids (e.g. stands
+        too small to cover a cell) have no neighbours
+        """
+        adjacency_ids = np.asarray(adjacency_ids)
+        stand_ids = np.asarray(stand_ids)
+        if adjacency.shape[0] != len(adjacency_ids):
+            raise ValueError('adjacency has {} rows for {} ids'.format(adjacency.shape[0], len(adjacency_ids)))
+        # Position of each stand in adjacency_ids, -1 if missing
+        pos = np.full(len(stand_ids), -1)
+        if len(adjacency_ids):
+            order = np.argsort(adjacency_ids, kind='stable')
+            k = order[np.minimum(np.searchsorted(adjacency_ids, stand_ids, sorter=order), len(adjacency_ids) - 1)]
+            pos = np.where(adjacency_ids[k] == stand_ids, k, -1)
+        found = np.flatnonzero(pos >= 0)
+        # Selection matrix from adjacency_ids order to stand_ids order
+        select = sparse.csr_matrix((np.ones(len(found), dtype=np.int32), (found, pos[found])),
+                                   shape=(len(stand_ids), len(adjacency_ids)))
+        self.adjacency = (select @ sparse.csr_matrix(adjacency, dtype=np.int32) @ select.T).tocsr()
+        self.green_up = green_up
+
+    @classmethod
+    def from_stand_index(cls, stand_index, stand_ids, green_up=5):
+        """ Green-up rule from the stand adjacency of a StandIndex, for an engine with stands in stand_ids order """
+        return cls(stand_index.adjacency(), stand_index.ids, stand_ids, green_up)
+
+    def __call__(self, engine, year):
+        if self.adjacency.shape[0] != engine.n_stands:
+            raise ValueError('GreenUp has {} stands, the engine has {}'.format(self.adjacency.shape[0],
+                                                                              engine.n_stands))
+        recent = (year - engine.last_harvest) < self.green_up
+        blocked = (self.adjacency @ recent.T.astype(np.int32)).T > 0
+        return ~np.asarray(blocked)
+
+
+# =======================================================================
+# Selection rules
+
+
+class AllEligible:
+    """ Harvest every eligible stand """
+
+    def __call__(self, engine, eligible, year):
+        return eligible
+
+
+class RandomFraction:
+    """ Harvest a random sample of up to ceil(fraction * n_stands) eligible stands each year """
+
+    def __init__(self, fraction):
+        self.fraction = fraction
+
+    def __call__(self, engine, eligible, year):
+        cut_number = int(np.ceil(engine.n_stands * self.fraction))
+        # Random priority for each eligible stand, harvesting the cut_number highest in each realization
+        keys = np.where(eligible, engine.rng.random(eligible.shape), -1.0)
+        rank = np.argsort(np.argsort(-keys, axis=1, kind='stable'), axis=1, kind='stable')
+        return eligible & (rank < cut_number)
+
+
+# =======================================================================
+
+
+class StandAgeEngine:
+    """ Ages and harvests of n_stands stands in n_realizations independent realizations """
+
+    def __init__(self, ages, eligibility, selection, n_realizations=1, rng=None):
+        ages = np.asarray(ages, dtype=np.int32)
+        self.n_stands = ages.shape[-1]
+        self.ages = np.array(np.broadcast_to(ages, (n_realizations, self.n_stands)))
+        self.last_harvest = np.full(self.ages.shape, np.iinfo(np.int32).min // 2, dtype=np.int64)
+        self.eligibility = list(eligibility)
+        self.selection = selection
+        self.rng = np.random.default_rng(rng)
+        self.eligible = None  # Eligible stands of the last step
+
+    def step(self, year):
+        """ Advances one year, returning the boolean (n_realizations, n_stands) array of stands harvested """
+        eligible = np.ones(self.ages.shape, dtype=bool)
+        for rule in self.eligibility:
+            eligible &= rule(self, year)
+        self.eligible = eligible
+        harvest = self.selection(self, eligible, year) if eligible.any() else eligible
+        self.ages += 1
+        self.ages[harvest] = 0
+        self.last_harvest[harvest] = year
+        return harvest
+
+    def run(self, start, end, stop_when_none_eligible=False):
+        """
+        Steps through the years start to end - 1. Returns a DataFrame of harvests with columns realization, year and
+        stand (position in the ages array). With stop_when_none_eligible, stops at the first year nothing is eligible
+        in any realization
+        """
+        realizations, years, stands = [], [], []
+        for year in range(start, end):
+            harvest = self.step(year)
+            if stop_when_none_eligible and not self.eligible.any():
+                break
+            r, s = np.nonzero(harvest)
+            realizations.append(r)
+            stands.append(s)
+            years.append(np.full(len(r), year))
+        if not years:
+            return pd.DataFrame({'realization': [], 'year': [], 'stand': []}, dtype=np.int64)
+        return pd.DataFrame({'realization': np.concatenate(realizations), 'year': np.concatenate(years),
+                             'stand': np.concatenate(stands)})
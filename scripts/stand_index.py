@@ -0,0 +1,141 @@
+# Stand ID grid plus a stand -> cell index, so that maps of any subset of stands can be built without rasterizing
+# The stand shapefile is rasterized once onto the DEM grid. Cells are then grouped by stand in a compressed sparse row
+# (CSR) table: the cells of the stand ids[k] are cells[indptr[k]:indptr[k + 1]], as flat indices into the grid.
+# A map of a set of stands is one scatter of their cell indices. Indexes can be cached as .npz files, keyed on the
+# contents of the shapefile and the template grid
+# Script written in Python 3.7
+
+import hashlib
+import os
+import numpy as np
+import geopandas as gpd
+from scipy import sparse
+import rasterio
+from pathlib import Path
+from rasterio import features
+from grid_cache import file_hash
+
+# ======================================================================================================================
+
+
+def rasterize_stands(stand_shp, template_path, id_field='VELMA_ID'):
+    """ Returns a grid of the id_field of the stand covering each cell (0 outside stands) on the template grid """
+    stands = stand_shp if isinstance(stand_shp, gpd.GeoDataFrame) else gpd.read_file(str(stand_shp))
+    with rasterio.open(str(template_path), 'r') as src:
+        out_shape = (src.height, src.width)
+        transform = src.transform
+    shapes = ((geom, int(value)) for geom, value in zip(stands.geometry, stands[id_field]))
+    return features.rasterize(shapes=shapes, fill=0, out_shape=out_shape, transform=transform, dtype=np.int32)
+
+
+def rasterize_attributes(stand_shp, template_path, columns, fill=-9999):
+    """
+    Returns {column: grid} of attribute columns of the stands on the template grid, cells outside stands set to fill
+    The polygons are burned once, as their row number, and each attribute grid is a lookup of that grid, so all grids
+    share the same stand boundaries. Where polygons overlap, the last one wins, as with features.rasterize
+    """
+    stands = stand_shp if isinstance(stand_shp, gpd.GeoDataFrame) else gpd.read_file(str(stand_shp))
+    with rasterio.open(str(template_path), 'r') as src:
+        out_shape = (src.height, src.width)
+        transform = src.transform
+    shapes = ((geom, row + 1) for row, geom in enumerate(stands.geometry))
+    row_grid = features.rasterize(shapes=shapes, fill=0, out_shape=out_shape, transform=transform, dtype=np.int32)
+    grids = {}
+    for column in columns:
+        values = stands[column].values
+        attr_table = np.concatenate([np.array([fill], dtype=np.result_type(values, type(fill))), values])
+        grids[column] = attr_table[row_grid]
+    return grids
+
+
+class StandIndex:
+    """ Stand ID grid and CSR table of the cells in each stand """
+
+    def __init__(self, id_grid):
+        self.id_grid = np.asarray(id_grid)
+        self.shape = self.id_grid.shape
+        flat = self.id_grid.ravel()
+        in_stand = np.flatnonzero(flat != 0)
+        order = np.argsort(flat[in_stand], kind='stable')
+        self.cells = in_stand[order]
+        self.ids, counts = np.unique(flat[self.cells], return_counts=True)
+        self.indptr = np.concatenate([[0], np.cumsum(counts)])
+
+    @classmethod
+    def from_shapefile(cls, stand_shp, template_path, id_field='VELMA_ID', cache_dir=None):
+        """ Rasterizes the stands onto the template grid, or loads the index from cache_dir if it was built before """
+        if cache_dir is None:
+            return cls(rasterize_stands(stand_shp, template_path, id_field))
+
+        # Geometry is in the .shp and the IDs in the .dbf, so both are part of the key
+        h = hashlib.blake2b(digest_size=16)
+        for path in [Path(stand_shp), Path(stand_shp).with_suffix('.dbf'), Path(template_path)]:
+            h.update(file_hash(path).encode())
+        h.update(id_field.encode())
+        cache_path = Path(cache_dir) / 'stands_{}.npz'.format(h.hexdigest())
+        if cache_path.exists():
+            return cls.load(cache_path)
+        index = cls(rasterize_stands(stand_shp, template_path, id_field))
+        index.save(cache_path)
+        return index
+
+    def save(self, path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = str(path) + '.{}.tmp'.format(os.getpid())
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, id_grid=self.id_grid)
+        os.replace(tmp_path, str(path))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(str(path)) as data:
+            return cls(data['id_grid'])
+
+    def stand_cells(self, stand_ids):
+        """ Flat indices of all cells in the given stands. Stands not on the grid are ignored """
+        stand_ids = np.asarray(stand_ids).ravel()
+        if len(self.ids) == 0:
+            return np.array([], dtype=np.intp)
+        k = np.searchsorted(self.ids, stand_ids)
+        k = k[(k < len(self.ids)) & (self.ids[np.minimum(k, len(self.ids) - 1)] == stand_ids)]
+        starts, stops = self.indptr[k], self.indptr[k + 1]
+        lengths = stops - starts
+        # Concatenated ranges start:stop for every stand, without a Python loop
+        offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        return self.cells[np.arange(lengths.sum()) + offsets]
+
+    def mask(self, stand_ids, out=None):
+        """ Boolean grid of the cells in the given stands """
+        if out is None:
+            out = np.zeros(self.shape, dtype=bool)
+        out.flat[self.stand_cells(stand_ids)] = True
+        return out
+
+    def stand_areas(self, exclude=None):
+        """ Number of cells in each stand, in the order of self.ids, not counting cells where exclude is True """
+        counts = np.diff(self.indptr)
+        if exclude is None:
+            return counts
+        keep = ~np.asarray(exclude, dtype=bool).ravel()[self.cells]
+        return np.bincount(np.repeat(np.arange(len(self.ids)), counts)[keep], minlength=len(self.ids))
+
+    def boundary_lengths(self, cellsize=1.0):
+        """
+        Sparse matrix of the length of boundary shared by each pair of stands (number of shared cell edges times
+        cellsize), with rows and columns in the order of self.ids. Cells outside stands (ID 0) don't connect the stands
+        on either side of them
+        """
+        pairs = []
+        for a, b in [(self.id_grid[:, :-1], self.id_grid[:, 1:]), (self.id_grid[:-1, :], self.id_grid[1:, :])]:
+            edge = (a != b) & (a != 0) & (b != 0)
+            pairs.append(np.stack([a[edge], b[edge]], axis=1))
+        pairs = np.concatenate(pairs)
+        i, j = np.searchsorted(self.ids, pairs[:, 0]), np.searchsorted(self.ids, pairs[:, 1])
+        n = len(self.ids)
+        # Duplicate (i, j) entries are summed, counting the shared edges of each pair
+        lengths = sparse.coo_matrix((np.full(len(i), float(cellsize)), (i, j)), shape=(n, n)).tocsr()
+        return lengths + lengths.T
+
+    def adjacency(self):
+        """ Sparse boolean matrix of stands sharing a cell edge, with rows and columns in the order of self.ids """
+        return self.boundary_lengths() > 0
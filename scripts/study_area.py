@@ -7,7 +7,7 @@ import geopandas as gpd
 import rasterio
 import tempfile
 from rasterio import features
-from soil_merger import readHeader
+from grid_io import read_grid, write_grid
 from scipy.ndimage.morphology import binary_fill_holes
 import importlib
 importlib.reload(config)
@@ -39,8 +39,7 @@ with rasterio.open(dem_file, 'r') as src:
         burned = features.rasterize(shapes=shapes, fill=np.nan, out=in_arr, transform=out.transform)
         out.write_band(1, burned)
 
-roi_header = readHeader(roi_raster)
-roi_asc = np.loadtxt(roi_raster, skiprows=6)
+roi_asc, roi_header = read_grid(roi_raster)
 
 
 # =======================================================================
@@ -48,7 +47,7 @@ roi_asc = np.loadtxt(roi_raster, skiprows=6)
 # =======================================================================
 
 dem_path = config.dem_velma.parents[0] / 'delineated_dem.asc'
-dem = np.loadtxt(dem_path, skiprows=6)
+dem, header = read_grid(dem_path)
 
 dem_simple = dem.astype('int16')
 dem_simple[dem_simple > 1] = 1
@@ -56,11 +55,7 @@ dem_simple[dem_simple < 1] = 0
 dem_simple = binary_fill_holes(dem_simple).astype(int)
 
 outfile = tmp_dir + '/upstream.asc'
-header = readHeader(str(dem_path))
-f = open(outfile, "w")
-f.write(header)
-np.savetxt(f, dem_simple, fmt="%i")
-f.close()
+write_grid(outfile, dem_simple, header, fmt="%i")
 
 with rasterio.Env():
     with rasterio.open(outfile) as src:
@@ -0,0 +1,6 @@
+# The scripts import each other as top-level modules (e.g. `from grid_io import read_grid`), so tests run with the
+# scripts directory on sys.path
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from grid_io import GridHeader, write_grid, read_grid
+from grid_tiles import iter_tiles, GridStreamWriter
+
+
+@pytest.fixture
+def ccap_with_nodata(tmp_path):
+    rng = np.random.default_rng(0)
+    arr = rng.integers(0, 7, (40, 30))
+    arr[5:9, 3:12] = -9999
+    arr[33, :] = -9999
+    header = GridHeader(30, 40, 0, 0, 10)
+    path = tmp_path / 'ccap.asc'
+    write_grid(path, arr, header, fmt='%i')
+    return path, arr, header
+
+
+def test_uint8_ascii_tiles_with_nodata(ccap_with_nodata):
+    path, arr, _ = ccap_with_nodata
+    data, masks = [], []
+    for tile in iter_tiles([path], tile_rows=7, halo=2, dtypes=np.uint8):
+        assert tile.data[0].dtype == np.uint8
+        data.append(tile.data[0][tile.core])
+        masks.append(tile.masks[0][tile.core])
+    data, masks = np.concatenate(data), np.concatenate(masks)
+    np.testing.assert_array_equal(masks, arr == -9999)
+    np.testing.assert_array_equal(data, np.where(arr == -9999, 0, arr))
+
+
+def test_nodata_kept_when_it_fits(ccap_with_nodata):
+    path, arr, _ = ccap_with_nodata
+    tiles = list(iter_tiles([path], tile_rows=16, dtypes=np.int16))
+    np.testing.assert_array_equal(np.concatenate([t.data[0] for t in tiles]), arr)
+    np.testing.assert_array_equal(np.concatenate([t.masks[0] for t in tiles]), arr == -9999)
+
+
+def test_geotiff_nodata_does_not_wrap(ccap_with_nodata, tmp_path):
+    rasterio = pytest.importorskip('rasterio')
+    _, arr, _ = ccap_with_nodata
+    path = tmp_path / 'ccap.tif'
+    with rasterio.open(str(path), 'w', driver='GTiff', height=arr.shape[0], width=arr.shape[1], count=1,
+                       dtype='int16', nodata=-9999) as ds:
+        ds.write(arr.astype(np.int16), 1)
+    tiles = list(iter_tiles([path], tile_rows=16, dtypes=np.uint8))
+    data = np.concatenate([t.data[0] for t in tiles])
+    assert not (data == 241).any()
+    np.testing.assert_array_equal(data, np.where(arr == -9999, 0, arr))
+    np.testing.assert_array_equal(np.concatenate([t.masks[0] for t in tiles]), arr == -9999)
+
+
+def test_out_of_range_values_raise(tmp_path):
+    arr = np.zeros((10, 10), dtype=int)
+    arr[8, 2] = 300
+    path = tmp_path / 'bad.asc'
+    write_grid(path, arr, GridHeader(10, 10, 0, 0, 10), fmt='%i')
+    with pytest.raises(ValueError, match='outside the range of uint8'):
+        list(iter_tiles([path], tile_rows=4, dtypes=np.uint8))
+
+
+def test_stream_writer_writes_masked_cells_as_nodata(ccap_with_nodata, tmp_path):
+    path, arr, header = ccap_with_nodata
+    out_path = tmp_path / 'out.asc'
+    with GridStreamWriter(out_path, header, fmt='%i') as out:
+        for tile in iter_tiles([path], tile_rows=7, dtypes=np.uint8):
+            out.write(np.ma.MaskedArray(tile.data[0], mask=tile.masks[0]))
+    np.testing.assert_array_equal(read_grid(out_path, dtype=np.int64)[0], arr)
+
+
+def test_stream_writers_leave_no_temp_files_on_error(tmp_path):
+    arr = np.zeros((10, 10), dtype=int)
+    arr[8, 2] = 300
+    path = tmp_path / 'bad.asc'
+    header = GridHeader(10, 10, 0, 0, 10)
+    write_grid(path, arr, header, fmt='%i')
+    with pytest.raises(ValueError):
+        with GridStreamWriter(tmp_path / 'a.asc', header) as a, GridStreamWriter(tmp_path / 'b.asc', header) as b:
+            for tile in iter_tiles([path], tile_rows=4, dtypes=np.uint8):
+                a.write(tile.data[0])
+                b.write(tile.data[0])
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['bad.asc']
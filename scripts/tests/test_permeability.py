@@ -0,0 +1,28 @@
+import numpy as np
+from scipy import ndimage
+from grid_io import GridHeader, write_grid, read_grid
+from permeability import build_permeability, sweep_outputs
+
+
+def test_sweep_with_nodata_matches_float_version(tmp_path):
+    rng = np.random.default_rng(1)
+    header = GridHeader(37, 53, 0, 0, 10)
+    ccap = rng.integers(0, 7, header.shape)
+    nlcd = rng.choice([21, 22, 41, 42], header.shape)
+    ccap[10:13, 4:20] = -9999
+    nlcd[30:34, :] = -9999
+    write_grid(tmp_path / 'ccap.asc', ccap, header, fmt='%i')
+    write_grid(tmp_path / 'nlcd.asc', nlcd, header, fmt='%i')
+
+    outputs = sweep_outputs(tmp_path, [0.25, 0.5], [0, 1, 2])
+    manifest = build_permeability(tmp_path / 'ccap.asc', tmp_path / 'nlcd.asc', outputs, tile_rows=8)
+    assert len(manifest) == len(outputs)
+
+    # Float version of cover_permeability.py, generalised to any road permeability and erosion
+    ccap, nlcd = ccap + 100.0, nlcd + 100.0
+    for path, fraction, erosion in outputs:
+        roads = (nlcd == 121) | (nlcd == 122)
+        if erosion:
+            roads = ndimage.binary_erosion(roads, iterations=erosion)
+        expected = np.where(roads | (ccap == 103) | (ccap == 102), np.float32(fraction), 1)
+        np.testing.assert_array_equal(read_grid(path, dtype=np.float32)[0], expected)
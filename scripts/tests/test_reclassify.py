@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+from reclassify import load_classes, reclassify
+
+
+def test_reclassify_ccap():
+    ccap_classes = load_classes('ccap')
+    raw = np.array([[0, 3], [5, 6]], dtype=np.uint8)
+    overlay = np.array([[False, True], [False, False]])
+    out = reclassify(raw, ccap_classes.lut(), overlays=[(overlay, 141)], classes=ccap_classes)
+    np.testing.assert_array_equal(out, [[100, 141], [105, 106]])
+
+
+def test_reclassify_rejects_unknown_values():
+    ccap_classes = load_classes('ccap')
+    raw = np.array([[0, 7], [9, 7]], dtype=np.uint8)
+    with pytest.raises(ValueError, match=r'\[7, 9\]'):
+        reclassify(raw, ccap_classes.lut(), classes=ccap_classes)
@@ -0,0 +1,100 @@
+import os
+import numpy as np
+import pytest
+from grid_io import GridHeader, read_grid, write_grid
+from soil_merger import lookAround, mergeSoils, readHeader
+
+
+def _old_merge_soils(ssurgoAsc, statsgoAsc, buildFile):
+    # mergeSoils before vectorization (xrange replaced with range), kept as the reference for the regression test
+    ssgoArray = read_grid(ssurgoAsc)[0]
+    statsArray = read_grid(statsgoAsc)[0]
+
+    row, col = ssgoArray.shape
+    mergeArray = np.zeros((row, col))
+
+    for i in range(row):
+        for j in range(col):
+            ssgoValue = ssgoArray[i, j]
+            statsValue = statsArray[i, j]
+
+            if ssgoValue != -9999:
+                mergeArray[i, j] = ssgoValue
+            elif statsValue != -9999:
+                mergeArray[i, j] = statsValue
+            else:
+                mergeArray[i, j] = -9999
+
+    fileName, fileExtension = os.path.splitext(buildFile)
+    mergeFile = fileName + "_mergedFile" + fileExtension
+    header = readHeader(ssurgoAsc)
+    write_grid(mergeFile, mergeArray, header, fmt="%i")
+
+    reloadArray = read_grid(mergeFile)[0]
+    noDataArray = np.zeros((row, col))
+
+    for i in range(row):
+        for j in range(col):
+            mergeValue = reloadArray[i, j]
+            if mergeValue == -9999:
+                noDataArray[i, j] = lookAround(i, j, reloadArray)
+            else:
+                noDataArray[i, j] = mergeValue
+
+    header = readHeader(ssurgoAsc)
+    write_grid(buildFile, noDataArray, header, fmt="%i")
+
+
+@pytest.fixture
+def soil_grids(tmp_path):
+    rng = np.random.default_rng(7)
+    shape = (48, 61)
+    header = GridHeader(shape[1], shape[0], 500000, 5100000, 10)
+
+    # gSSURGO with large gaps, including the grid edges
+    ssurgo = rng.integers(1, 13, shape).astype(float)
+    ssurgo[5:30, 10:40] = -9999
+    ssurgo[:, 55:] = -9999
+    ssurgo[44:, :20] = -9999
+    ssurgo[rng.random(shape) < 0.1] = -9999
+
+    # Coarser STATSGO2, with gaps that partly overlap the gSSURGO gaps so that some cells have neither
+    statsgo = np.repeat(np.repeat(rng.integers(1, 13, (8, 11)), 6, axis=0), 6, axis=1)[:shape[0], :shape[1]]
+    statsgo = statsgo.astype(float)
+    statsgo[12:26, 15:34] = -9999
+    statsgo[:8, 50:] = -9999
+    statsgo[40:, :25] = -9999
+
+    paths = {}
+    for name, arr in [('ssurgo', ssurgo), ('statsgo', statsgo)]:
+        paths[name] = str(tmp_path / '{}.asc'.format(name))
+        write_grid(paths[name], arr, header, fmt='%i')
+    assert ((ssurgo == -9999) & (statsgo == -9999)).sum() > 100
+    return paths
+
+
+def _read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_merge_soils_matches_old_loops(soil_grids, tmp_path):
+    old_out = str(tmp_path / 'old' / 'soil.asc')
+    new_out = str(tmp_path / 'new' / 'soil.asc')
+    os.makedirs(os.path.dirname(old_out))
+    os.makedirs(os.path.dirname(new_out))
+
+    _old_merge_soils(soil_grids['ssurgo'], soil_grids['statsgo'], old_out)
+    mergeSoils(soil_grids['ssurgo'], soil_grids['statsgo'], new_out, writeMergeFile=True)
+
+    assert _read_bytes(new_out) == _read_bytes(old_out)
+    assert _read_bytes(new_out.replace('.asc', '_mergedFile.asc')) == \
+        _read_bytes(old_out.replace('.asc', '_mergedFile.asc'))
+    assert (read_grid(new_out)[0] != -9999).all()
+
+
+def test_merged_file_only_written_on_request(soil_grids, tmp_path):
+    out = str(tmp_path / 'soil.asc')
+    mergeSoils(soil_grids['ssurgo'], soil_grids['statsgo'], out)
+    assert os.path.exists(out)
+    assert not os.path.exists(str(tmp_path / 'soil_mergedFile.asc'))
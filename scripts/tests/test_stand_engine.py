@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from stand_engine import StandAgeEngine, AgeThreshold, AllEligible, GreenUp
+
+# Stands 10 - 20 - 30 - 40 in a row, adjacency in sorted id order as from StandIndex.adjacency()
+ADJACENCY_IDS = np.array([10, 20, 30, 40])
+ADJACENCY = sparse.csr_matrix(np.array([[0, 1, 0, 0],
+                                        [1, 0, 1, 0],
+                                        [0, 1, 0, 1],
+                                        [0, 0, 1, 0]], dtype=bool))
+
+
+def test_green_up_follows_engine_stand_order():
+    stand_ids = np.array([40, 10, 30, 20, 50])  # 50 has no cells, so no neighbours
+    ages = np.array([0, 0, 0, 0, 0])
+    green_up = GreenUp(ADJACENCY, ADJACENCY_IDS, stand_ids, green_up=5)
+    engine = StandAgeEngine(ages, [green_up], AllEligible())
+    engine.last_harvest[0, 1] = 2000  # Stand 10 harvested in 2000
+    eligible = green_up(engine, 2001)[0]
+    # Only stand 20, at position 3, neighbours stand 10
+    np.testing.assert_array_equal(eligible, [True, True, True, False, True])
+
+
+def test_green_up_rejects_engine_with_other_stands():
+    green_up = GreenUp(ADJACENCY, ADJACENCY_IDS, [10, 20, 30, 40])
+    engine = StandAgeEngine(np.zeros(3), [AgeThreshold(0), green_up], AllEligible())
+    with pytest.raises(ValueError, match='GreenUp has 4 stands, the engine has 3'):
+        engine.step(2000)
@@ -2,8 +2,7 @@
 # Script written in Python 3.7
 
 import config as config
-import numpy as np
-import rasterio
+from raster_catalog import RasterCatalog
 import importlib
 importlib.reload(config)
 
@@ -12,20 +11,20 @@ importlib.reload(config)
 # =======================================================================
 # Check for file extent and NoData cells
 # =======================================================================
+# Headers and statistics come from the raster catalog of the VELMA data folder, which only re-reads changed files
 
 velma_file_paths = [config.dem_velma, config.fac_velma, config.cover_type_merge_velma, config.cover_age_velma,
                     config.cover_id_velma, config.soil_velma]
 
+catalog = RasterCatalog(config.velma_data)
+catalog.scan()
+
 dem_file = config.dem_velma
-size = np.loadtxt(str(dem_file), skiprows=6).shape
 
 print('Checking file extent')
+for message in catalog.check_alignment(dem_file, velma_file_paths):
+    print(message)
 for path in velma_file_paths:
-    file = np.loadtxt(str(path), skiprows=6)
-    if file.shape != size:
-        print('Shape mismatch: {} in {}'.format(file.shape, path))
-    with rasterio.open(path, 'r') as src:
-        nodata_val = src.nodatavals[0]
-    if nodata_val in file:
-        print('NoData value of {} in {}'.format(nodata_val, path))
-
+    entry = catalog.get(path)
+    if entry['nodata_count'] > 0:
+        print('NoData value of {} in {}'.format(entry['nodata'], path))
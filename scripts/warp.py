@@ -0,0 +1,121 @@
+# Python 3.x (rasterio/GDAL) replacement for the ArcPy reshape pipeline in utils.py (getROI, getDEMspecs, reshape,
+# velma_format). Each input layer is read only over the buffered study area, reprojected straight onto the DEM grid
+# (same CRS, cell size, snapping and extent) in a single in-memory warp, gap-filled and written as an ASCII grid.
+# No temp GeoTIFFs are written, and layers are processed in parallel. No ArcGIS license needed
+# Script written in Python 3.7
+
+import copy
+import numpy as np
+import geopandas as gpd
+import rasterio
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from affine import Affine
+from rasterio.crs import CRS
+from rasterio.enums import Resampling
+from rasterio.warp import reproject, transform_bounds
+from rasterio.windows import Window, from_bounds
+from grid_io import GridHeader, write_grid
+from gap_fill import fill_gaps
+
+# ======================================================================================================================
+
+
+class DEMGrid:
+    """ Target grid of the VELMA DEM: CRS, transform, shape and cell size. Python 3.x version of getDEMspecs """
+
+    def __init__(self, dem_path, crs=None):
+        with rasterio.open(str(dem_path), 'r') as src:
+            self.transform = src.transform
+            self.width = src.width
+            self.height = src.height
+            self.bounds = tuple(src.bounds)
+            self.cellsize = src.res[0]
+            self.crs = src.crs
+        # ASCII grids often come without a .prj, so the projection file from the config can be given instead
+        if crs is not None:
+            crs = str(crs)
+            self.crs = CRS.from_wkt(Path(crs).read_text()) if Path(crs).exists() else CRS.from_user_input(crs)
+        if self.crs is None:
+            raise ValueError('No CRS for {}, pass one with crs='.format(dem_path))
+
+    def resampled(self, cellsize):
+        """ Copy of the grid with the same extent and a different cell size, e.g. to go from 10m to 5m """
+        grid = copy.copy(self)
+        grid.width = int(round(self.width * self.cellsize / cellsize))
+        grid.height = int(round(self.height * self.cellsize / cellsize))
+        grid.transform = Affine(cellsize, 0, self.bounds[0], 0, -cellsize, self.bounds[3])
+        grid.bounds = (self.bounds[0], self.bounds[3] - grid.height * cellsize,
+                       self.bounds[0] + grid.width * cellsize, self.bounds[3])
+        grid.cellsize = cellsize
+        return grid
+
+    def header(self, nodata=-9999):
+        return GridHeader(ncols=self.width, nrows=self.height, xll=self.bounds[0], yll=self.bounds[1],
+                          cellsize=self.cellsize, nodata=nodata)
+
+
+def roi_bounds(roi_path, crs, buffer=3000):
+    """ Bounds of the study area buffered by buffer map units (3 km, as in getROI), in the given CRS """
+    roi = gpd.read_file(str(roi_path)).to_crs(crs)
+    return tuple(roi.buffer(buffer).total_bounds)
+
+
+def warp_to_grid(in_path, grid, resampling='nearest', bounds=None, nodata=-9999):
+    """
+    Returns the first band of a raster reprojected onto grid. If bounds are given (in the grid CRS, e.g. from
+    roi_bounds), only the part of the source covering them and the grid is read. Sources without a CRS (e.g. ASCII
+    grids without a .prj) are taken to be in the grid CRS
+    """
+    with rasterio.open(str(in_path), 'r') as src:
+        window = None
+        if bounds is not None:
+            bounds = (min(bounds[0], grid.bounds[0]), min(bounds[1], grid.bounds[1]),
+                      max(bounds[2], grid.bounds[2]), max(bounds[3], grid.bounds[3]))
+            src_bounds = transform_bounds(grid.crs, src.crs or grid.crs, *bounds, densify_pts=21)
+            window = from_bounds(*src_bounds, transform=src.transform)
+            # One extra source cell on each side, so cells on the edge of the grid warp as if the whole source was read
+            window = Window(window.col_off - 1, window.row_off - 1, window.width + 2,
+                                             window.height + 2).round_offsets(op='floor').round_lengths(op='ceil')
+            window = window.intersection(Window(0, 0, src.width, src.height))
+        src_arr = src.read(1, window=window)
+        src_transform = src.window_transform(window) if window is not None else src.transform
+        src_crs = src.crs if src.crs is not None else grid.crs
+        src_nodata = src.nodata
+
+    dtype = np.float32 if np.issubdtype(src_arr.dtype, np.floating) else np.int32
+    dst = np.full((grid.height, grid.width), nodata, dtype=dtype)
+    reproject(source=src_arr, destination=dst, src_transform=src_transform, src_crs=src_crs, src_nodata=src_nodata,
+              dst_transform=grid.transform, dst_crs=grid.crs, dst_nodata=nodata,
+              resampling=getattr(Resampling, resampling.lower()))
+    return dst
+
+
+def reshape_layer(name, in_path, out_path, resampling, grid, bounds, fill=None, fmt='%i', nodata=-9999):
+    """ Warps one layer onto the DEM grid, fills its NoData cells (see gap_fill.fill_gaps) and writes it as ASCII """
+    print('Prepping ' + name + ' ...')
+    arr = warp_to_grid(in_path, grid, resampling=resampling, bounds=bounds, nodata=nodata)
+    counts = None
+    if fill is not None:
+        arr, counts = fill_gaps(arr, nodata, **fill)
+    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+    write_grid(out_path, arr, grid.header(nodata=nodata), fmt=fmt)
+    print('Done: ' + name)
+    return name, counts
+
+
+def _reshape_job(job):
+    return reshape_layer(**job)
+
+
+def reshape_layers(layers, grid, bounds, processes=None):
+    """
+    Warps several layers onto the DEM grid in parallel. layers is a list of dicts of reshape_layer arguments
+    (name, in_path, out_path, resampling, and optionally fill and fmt). Returns {name: NoData fill counts}
+    Scripts calling this must do so under `if __name__ == '__main__':`, as worker processes re-import them on Windows
+    """
+    jobs = [dict(layer, grid=grid, bounds=bounds) for layer in layers]
+    if processes == 1:
+        return dict(_reshape_job(job) for job in jobs)
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return dict(pool.map(_reshape_job, jobs))
@@ -0,0 +1,54 @@
+# Zonal composition of categorical layers: cell counts, areas and fractions of each class within each zone
+# Zones are either a grid of zone labels (e.g. sub-basins, experimental basins or stand IDs), or a dict of boolean
+# masks that may overlap (e.g. a watershed and its riparian buffer). Either way, every (zone, class) pair is counted
+# with one np.bincount over a combined key, zone index * number of classes + class index
+# Script written in Python 3.7
+
+import numpy as np
+import pandas as pd
+
+# ======================================================================================================================
+
+
+def _zone_cells(zones, valid):
+    """ Zone names, and the zone index and flat cell index of every (zone, cell) pair """
+    if isinstance(zones, dict):
+        names = list(zones)
+        cells = [np.flatnonzero(np.asarray(mask, dtype=bool).ravel() & valid) for mask in zones.values()]
+        zone_idx = np.repeat(np.arange(len(names)), [len(c) for c in cells])
+        cells = np.concatenate(cells) if cells else np.array([], dtype=np.intp)
+        return names, zone_idx, cells
+    labels = np.ma.getdata(zones).ravel()
+    cells = np.flatnonzero(valid & ~np.ma.getmaskarray(zones).ravel())
+    names, zone_idx = np.unique(labels[cells], return_inverse=True)
+    return names.tolist(), zone_idx.ravel(), cells
+
+
+def zonal_composition(zones, layer, cellsize=None, class_names=None, ignore=None):
+    """
+    Tidy DataFrame with one row per zone and class present: zone, class, count, fraction of the zone's cells and,
+    if cellsize is given, area_ha
+    zones: grid of zone labels (masked cells and cells labelled ignore are in no zone) or a dict of {name: mask}
+    layer: categorical grid. Masked cells are left out of every zone
+    class_names: optional {class value: name}, added as a class_name column
+    """
+    valid = ~np.ma.getmaskarray(layer).ravel()
+    if ignore is not None and not isinstance(zones, dict):
+        zones = np.ma.masked_equal(zones, ignore)
+    zone_names, zone_idx, cells = _zone_cells(zones, valid)
+
+    classes, class_idx = np.unique(np.ma.getdata(layer).ravel()[cells], return_inverse=True)
+    n_classes = len(classes)
+    counts = np.bincount(zone_idx * n_classes + class_idx.ravel(), minlength=len(zone_names) * n_classes)
+    counts = counts.reshape(len(zone_names), n_classes)
+
+    zone_i, class_i = np.nonzero(counts)
+    out = pd.DataFrame({'zone': np.asarray(zone_names, dtype=object)[zone_i],
+                        'class': classes[class_i],
+                        'count': counts[zone_i, class_i]})
+    out['fraction'] = out['count'] / counts.sum(axis=1)[zone_i]
+    if cellsize is not None:
+        out['area_ha'] = out['count'] * cellsize ** 2 / 1e4
+    if class_names is not None:
+        out['class_name'] = out['class'].map(class_names)
+    return out